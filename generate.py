@@ -13,6 +13,8 @@ def main(argv = None):
     parser.add_argument('-v', '--validate', help = "run validation of generated test inputs", action = "store_true")
     parser.add_argument('-c', '--compile', help = "force compilation of generators from sources", action = "store_true")
     parser.add_argument('-e', '--stop-on-error', help = "stop script after first error encountered", action = "store_true")
+    parser.add_argument('-j', '--jobs', help = "number of generator lines (and solution runs generating outputs) to run in parallel (0 means 'number of CPU cores')", type = int, default = 1)
+    parser.add_argument('-f', '--force', help = "execute all lines of script and generate all outputs, even if they are up to date", action = "store_true")
     parser.add_argument('-q', '--quiet', help = "print only results (no intermediate messages)", action = "store_true")
     parser.add_argument('-a', '--all', help = "perform full generation and validation of complete problem (implies -c, -v, -e, -s)", action = "store_true")
     args = parser.parse_args(argv)
@@ -22,6 +24,10 @@ def main(argv = None):
             args.solution = list(filter(lambda s: '_ok' in s, get_sources_in_problem(solutions = True)))[0]
 
     cfg = Config(quiet = args.quiet, stop = args.stop_on_error)
+    cfg.jobs = args.jobs if args.jobs > 0 else (psutil.cpu_count() or 1)
+    manifest = cfg.gen_manifest = GenerationManifest()
+    if args.force:
+        manifest.clear()
     script_results = compile_results = generate_results = test_results = None
     validate_results = None     # type: Optional[Union[str, List[str]]]
 
@@ -60,18 +66,30 @@ def main(argv = None):
         # validate the tests just generated
         if args.validate:
             test_inputs = [get_test_input(k) for k in test_indices]
-            validate_results = validate_many_tests(test_inputs, cfg.quiet)
+            validate_results = validate_many_tests(test_inputs, cfg.quiet, cfg.jobs)
             if len(validate_results) > 0:
                 on_error(4)
 
-        # generate output files by running the solution
+        # generate output files by running the solution (only for tests with changed inputs)
         if args.solution is not None:
-            test_results = (args.solution, check_solution(cfg, args.solution, ','.join(str(i) for i in test_indices), True))
-            if not all(res.verdict in ['A', '.'] for res in test_results[1]):
-                on_error(5)
+            outdated = [k for k in test_indices if not manifest.is_output_up_to_date(k, args.solution)]
+            if len(outdated) > 0:
+                test_results = (args.solution, check_solution(cfg, args.solution, ','.join(str(i) for i in outdated), True))
+                verdicts = dict(zip(get_tests_inputs(), [res.verdict for res in test_results[1]]))
+                for k in outdated:
+                    # output file is written only for these verdicts (see check_solution_on_test)
+                    if verdicts.get(get_test_input(k)) in ['A', 'W', 'P', 'J']:
+                        manifest.record_output(k, args.solution)
+                    else:
+                        manifest.forget_output(k)
+                if not all(res.verdict in ['A', '.'] for res in test_results[1]):
+                    on_error(5)
+            else:
+                printq(cfg.quiet, "All output files are up to date")
 
     except (StopError):
         pass
+    manifest.save()
 
     # print all results in one batch
     if script_results is not None:
@@ -1,20 +1,27 @@
 from __future__ import division
 from __future__ import print_function 
 from __future__ import absolute_import
-import glob, fnmatch, os, shutil, re, itertools, operator, string, random, subprocess, copy, time, tempfile
+import glob, fnmatch, os, sys, shutil, re, itertools, operator, string, random, subprocess, copy, time, tempfile, threading, select, hashlib, json, sqlite3, platform
 import sarge                            # simple wrapper over subprocess
 import psutil                           # for measuring CPU time and memory
 import colorama                         # for colored console output (cross-platform)
 from os import path
 from collections import namedtuple
-from typing import Any, Optional, Callable, Union, Iterable, Pattern, List, Tuple, Dict, NamedTuple, IO, Iterator
+from typing import Any, Optional, Callable, Union, Iterable, Pattern, List, Tuple, Dict, Set, NamedTuple, IO, Iterator, cast
 from nsuolymp_cfg import *  # load some user preferences
+try:
+    import numpy                        # optional: for fast numeric comparison in built-in checker
+except ImportError:
+    numpy = None                        # type: ignore
 
 # print all the given things if quiet = False
+# messages are printed under print_lock, so that messages from different threads do not interleave (see Config.jobs)
+print_lock = threading.RLock()
 def printq(quiet, *args):
     # type: (bool, *Any) -> None
     if not quiet:
-        print(*args)
+        with print_lock:
+            print(*args)
 
 # wrapper for getting size of file (-1 if file is not present)
 def getfilesize(src):
@@ -24,10 +31,12 @@ def getfilesize(src):
     return -1
         
 # wrapper for copying files
+# note: dst is deleted first, so that data is never written into a file hard-linked elsewhere (see stage_file)
 def copyfile(src, dst):
     # type: (str, str) -> None
     if path.abspath(src) == path.abspath(dst):
         return
+    removefile(dst)
     shutil.copyfile(src, dst)
         
 # wrapper for deleting files
@@ -36,6 +45,117 @@ def removefile(fn):
     if path.isfile(fn):
         os.remove(fn)
 
+if os.name != 'nt':
+    import fcntl
+
+# how many bytes of data were put into place by stage_file, per method: link, reflink, move, copy
+staged_bytes = {'link': 0, 'reflink': 0, 'move': 0, 'copy': 0}
+staged_bytes_lock = threading.Lock()
+
+# tries to create dst as a copy-on-write clone of src (works on btrfs, xfs and some others)
+# returns False if it is not supported
+def reflink_file(src, dst):
+    # type: (str, str) -> bool
+    if not sys.platform.startswith('linux'):
+        return False
+    FICLONE = 0x40049409
+    try:
+        with open(src, 'rb') as fsrc:
+            with open(dst, 'wb') as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        return True
+    except (IOError, OSError):
+        removefile(dst)
+        return False
+
+# puts contents of src file at dst path, avoiding copying data when possible
+# if move = True, then src is not needed anymore, and it is simply renamed to dst
+# if trusted = True, then dst can become hard link to src:
+#    so only trusted programs (checker, interactor) may have access to it, and nobody must ever write into it
+#    note that copyfile and removefile never write into existing file, so they are safe
+# otherwise, copy-on-write clone is tried, else data is copied
+#    (hard link is never used, even if src is read-only: solution may run as root, or owner may chmod it back)
+# if atomic = True, then file is first staged under temporary name near dst, and then renamed to dst:
+#    so dst always has either old or new contents, even if process is interrupted
+# the number of bytes staged is accounted in staged_bytes
+def stage_file(src, dst, trusted = False, move = False, atomic = False):
+    # type: (str, str, bool, bool, bool) -> None
+    if path.abspath(src) == path.abspath(dst):
+        return
+    if atomic:
+        (fd, tmp) = tempfile.mkstemp(prefix = '.' + path.basename(dst) + '.', suffix = '.tmp', dir = path.dirname(dst) or '.')
+        os.close(fd)
+        try:
+            stage_file(src, tmp, trusted, move)
+            replace_file(tmp, dst)
+        finally:
+            removefile(tmp)
+        return
+    removefile(dst)
+    size = getfilesize(src)
+    method = None       # type: Optional[str]
+    if move:
+        try:
+            os.rename(src, dst)
+            method = 'move'
+        except OSError:     # e.g. different filesystems
+            pass
+    if method is None and os.name != 'nt' and trusted:
+        try:
+            os.link(src, dst)
+            method = 'link'
+        except OSError:
+            pass
+    if method is None and reflink_file(src, dst):
+        method = 'reflink'
+    if method is None:
+        shutil.copyfile(src, dst)
+        method = 'copy'
+    with staged_bytes_lock:
+        staged_bytes[method] += size
+
+# renames src file to dst, replacing dst if it exists (atomically, except for Python 2 on Windows)
+def replace_file(src, dst):
+    # type: (str, str) -> None
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if os.name == 'nt':
+            removefile(dst)
+        os.rename(src, dst)
+
+# returns human-readable summary of staged_bytes
+def format_staged_bytes():
+    # type: () -> str
+    def size_str(size):
+        # type: (int) -> str
+        return "%0.1f MB" % (size / 2**20) if size >= 2**20 else "%0.1f KB" % (size / 2**10)
+    parts = ["%s %s" % (m, size_str(staged_bytes[m])) for m in ['link', 'reflink', 'move', 'copy'] if staged_bytes[m] > 0]
+    return "Staged %s of test data (%s), actually copied %s" % (size_str(sum(staged_bytes.values())), ', '.join(parts), size_str(staged_bytes['copy']))
+
+# context manager which puts given data into anonymous file in memory (memfd on Linux), and returns its file descriptor
+# the descriptor can be passed as stdin to processes (rewind it with lseek before each use)
+# returns None if such files are not supported
+class memory_file():
+    def __init__(self, data):
+        # type: (bytes) -> None
+        self.data = data
+        self.fd = None  # type: Optional[int]
+    def __enter__(self):
+        # type: () -> Optional[int]
+        if not hasattr(os, 'memfd_create'):
+            return None
+        self.fd = os.memfd_create('nsuolymp')
+        view = memoryview(self.data)
+        while len(view) > 0:
+            view = view[os.write(self.fd, view):]
+        return self.fd
+    def __exit__(self, *exc_info):
+        # type: (Any) -> None
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
 # context manager to restore CWD easily
 class save_cwd():
     def __enter__(self):
@@ -71,6 +191,42 @@ def write_file_contents(filepath, contents):
     with open(filepath, 'wb') as f:
         f.write(contents)
 
+# memoized file hashes: path -> (size, mtime, hash)
+file_hashes = {}    # type: Dict[str, Tuple[int, float, str]]
+
+# returns SHA-1 hex digest of given file contents (or None if it is not present)
+# results are memoized by file size and modification time, so that big tests are hashed only once
+# memoize = False must be used for files which are rewritten often (modification time has limited precision)
+def hash_file(filepath, memoize = True):
+    # type: (str, bool) -> Optional[str]
+    if not path.isfile(filepath):
+        return None
+    key = path.abspath(filepath)
+    st = os.stat(filepath)
+    known = file_hashes.get(key)
+    if memoize and known is not None and known[0] == st.st_size and known[1] == st.st_mtime:
+        return known[2]
+    h = hashlib.sha1()
+    with open(filepath, 'rb') as f:
+        while True:
+            chunk = f.read(2**20)
+            if not chunk:
+                break
+            h.update(chunk)
+    file_hashes[key] = (st.st_size, st.st_mtime, h.hexdigest())
+    return h.hexdigest()
+
+# remembers that given file (in its current state) has given hash, e.g. computed while writing it (see hash_file)
+def remember_file_hash(filepath, digest):
+    # type: (str, str) -> None
+    st = os.stat(filepath)
+    file_hashes[path.abspath(filepath)] = (st.st_size, st.st_mtime, digest)
+
+# returns SHA-1 hex digest of arbitrary JSON-serializable data
+def hash_data(data):
+    # type: (Any) -> str
+    return hashlib.sha1(json.dumps(data, sort_keys = True).encode()).hexdigest()
+
 # returns a function that can run given CMD line
 # it supresses output to stdout/stderr if quiet is set
 def cmd_runner(quiet = False):
@@ -581,8 +737,21 @@ if os.name == 'nt':
     SEM_FAILCRITICALERRORS = 0x0001
     ctypes.windll.kernel32.SetErrorMode(SEM_NOGPFAULTERRORBOX | SEM_FAILCRITICALERRORS)
 
-#RunResult = namedtuple('RunResult', 'verdict exit_code time memory')
-RunResult = NamedTuple('RunResult', [('verdict', str), ('exit_code', int), ('time', float), ('memory', float)])
+#RunResult = namedtuple('RunResult', 'verdict exit_code time memory cached times wait_time')
+# note: cached is True if result was taken from VerdictCache instead of running
+# note: times contains CPU times of all runs if solution was run several times (see run_solution_repeatedly)
+# note: wait_time is time spent by process runnable but waiting for CPU in run queue (zero if unknown), see is_run_contended
+RunResult = NamedTuple('RunResult', [('verdict', str), ('exit_code', int), ('time', float), ('memory', float), ('cached', bool), ('times', List[float]), ('wait_time', float)])
+
+# returns whether timing of the run is unreliable because it competed for CPU with other work on the host
+# this is detected by time spent waiting in run queue being too large compared to CPU time (see contention_wait_ratio in config)
+# note: unlike wall time, it does not grow when solution sleeps or blocks on I/O
+# note: runs with CPU time less than contention_min_time are never considered, their timing is dominated by startup
+def is_run_contended(res):
+    # type: (RunResult) -> bool
+    if res.time < contention_min_time:
+        return False
+    return res.wait_time > contention_wait_ratio * res.time
 
 # if not in quiet mode, prints some info about several processes soon to be started
 # each argument (except "quiet") is a list with one element per process
@@ -600,6 +769,182 @@ def proclaim_process_runs(popen_args, time_limits, memory_limits, quiet = False)
             ml_str = "%0.1lf" % ml
         print("{0}: Starting: {1}    [TL = {2}, ML = {3}]".format(i, str(popen_args[i]), tl_str, ml_str))
 
+# whether terminated processes are reaped with os.wait4, which gives exact CPU time
+# otherwise psutil is used, and all the measurements are lower bounds obtained by periodic sampling
+use_wait4_supervision = sys.platform.startswith('linux') and hasattr(os, 'wait4')
+if use_wait4_supervision:
+    import resource
+
+# returns peak resident memory of a running process (in MB) as recorded by Linux kernel
+# unlike current RSS, it does not miss short memory spikes between samples
+# returns None if not available (e.g. process has finished)
+def read_peak_memory_linux(pid):
+    # type: (int) -> Optional[float]
+    try:
+        with open('/proc/%d/status' % pid, 'rb') as f:
+            for line in f:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+# returns time (in seconds) which running process has spent waiting for CPU in run queue, as recorded by Linux kernel
+# returns None if not available (e.g. process has finished, or not on Linux)
+def read_run_delay_linux(pid):
+    # type: (int) -> Optional[float]
+    data = read_file_contents('/proc/%d/schedstat' % pid)
+    try:
+        return int(data.split()[1]) * 1e-9 if data is not None else None
+    except (IndexError, ValueError):
+        return None
+
+# opens a file descriptor which becomes readable when given process terminates
+# returns None if pidfd is not supported (Python < 3.9 or Linux < 5.3)
+def open_process_fd(pid):
+    # type: (int) -> Optional[int]
+    if not hasattr(os, 'pidfd_open'):
+        return None
+    try:
+        return int(getattr(os, 'pidfd_open')(pid))
+    except OSError:
+        return None
+
+# context manager which creates a separate cgroup v2 for running one process (see cgroup_root in nsuolymp_cfg.py)
+# memory.max is set to memory limit (in MB) with some headroom: it is only a hard backstop against runaway allocations,
+# since kernel also charges page cache and tmpfs pages (e.g. output file in scratch_root = '/dev/shm') to the cgroup
+# normal 'M' verdict is given by comparing anonymous memory of the cgroup with the limit (see read_cgroup_usage)
+# returns itself if cgroup was created, or None if cgroups are not available (then psutil limits are used)
+# pass move_self as preexec_fn to Popen, so that the process is started inside the cgroup
+# on exit, all processes left in the cgroup are killed, and the cgroup is removed
+class run_cgroup():
+    backstop_factor = 2.0
+    counter = [0]
+    lock = threading.Lock()
+    def __init__(self, memory_limit):
+        # type: (Optional[float]) -> None
+        self.memory_limit = memory_limit
+        self.path = None        # type: Optional[str]
+        self.procs_fd = None    # type: Optional[int]
+    def __enter__(self):
+        # type: () -> Optional[run_cgroup]
+        if cgroup_root is None or not sys.platform.startswith('linux'):
+            return None
+        with run_cgroup.lock:
+            run_cgroup.counter[0] += 1
+            name = 'nsuolymp_%d_%d' % (os.getpid(), run_cgroup.counter[0])
+        try:
+            os.mkdir(path.join(cgroup_root, name))
+            self.path = path.join(cgroup_root, name)
+            if self.memory_limit is not None:
+                backstop = self.memory_limit * run_cgroup.backstop_factor
+                write_file_contents(path.join(self.path, 'memory.max'), str(int(backstop * 2**20)).encode())
+                if path.isfile(path.join(self.path, 'memory.swap.max')):
+                    write_file_contents(path.join(self.path, 'memory.swap.max'), b'0')
+            self.procs_fd = os.open(path.join(self.path, 'cgroup.procs'), os.O_WRONLY)
+        except (IOError, OSError):
+            self.__exit__(None, None, None)
+            return None
+        return self
+    def move_self(self):
+        # type: () -> None
+        # called in child process between fork and exec: writing zero moves the writer itself
+        assert(self.procs_fd is not None)
+        os.write(self.procs_fd, b'0')
+    def __exit__(self, *exc_info):
+        # type: (Any) -> None
+        if self.procs_fd is not None:
+            os.close(self.procs_fd)
+            self.procs_fd = None
+        if self.path is None:
+            return
+        try:
+            if path.isfile(path.join(self.path, 'cgroup.kill')):
+                write_file_contents(path.join(self.path, 'cgroup.kill'), b'1')
+            else:
+                for pid in (read_file_contents(path.join(self.path, 'cgroup.procs')) or b'').split():
+                    os.kill(int(pid), 9)
+        except (IOError, OSError):
+            pass
+        for attempt in range(100):      # killed processes may need some time to leave
+            try:
+                os.rmdir(self.path)
+                break
+            except OSError:
+                time.sleep(0.01)
+        self.path = None
+
+# reads resource usage of all processes in given cgroup v2 (at the moment or in the end)
+# returns triple: user CPU time (in seconds), current anonymous memory (in MB), and whether OOM killer was invoked
+# note: memory.peak is not used, since it includes page cache and tmpfs pages (e.g. of output file)
+def read_cgroup_usage(cgroup):
+    # type: (str) -> Tuple[float, float, bool]
+    def read_keyed(filename):
+        # type: (str) -> Dict[bytes, int]
+        data = read_file_contents(path.join(cgroup, filename)) or b''
+        pairs = [line.split() for line in data.splitlines()]
+        return {p[0]: int(p[1]) for p in pairs if len(p) == 2}
+    cpu_time = read_keyed('cpu.stat').get(b'user_usec', 0) * 1e-6
+    anon_memory = read_keyed('memory.stat').get(b'anon', 0) / 2**20
+    oom_killed = read_keyed('memory.events').get(b'oom_kill', 0) > 0
+    return (cpu_time, anon_memory, oom_killed)
+
+# returns list of logical CPUs sharing the same physical core with given one (including itself)
+def get_core_siblings(cpu):
+    # type: (int) -> List[int]
+    data = read_file_contents('/sys/devices/system/cpu/cpu%d/topology/thread_siblings_list' % cpu)
+    res = []    # type: List[int]
+    try:
+        for part in (data or b'').decode().strip().split(','):
+            bounds = [int(x) for x in part.split('-')]
+            res += range(bounds[0], bounds[-1] + 1)
+    except ValueError:
+        pass
+    return res or [cpu]
+
+# context manager which takes dedicated CPU cores for one run of solution (see pin_cpu_cores in nsuolymp_cfg.py)
+# the first core is for the solution, the second one (if count = 2) is for its interactor: sibling core is preferred
+# returns list of taken cores, which is empty if there are no free cores or pinning is not supported
+# cores are shared between all threads (see Config.jobs), and are returned to pool on exit
+class pinned_cores():
+    busy = set()    # type: Set[int]
+    lock = threading.Lock()
+    def __init__(self, count):
+        # type: (int) -> None
+        self.count = count
+        self.cores = []     # type: List[int]
+    def __enter__(self):
+        # type: () -> List[int]
+        if not hasattr(os, 'sched_setaffinity'):
+            return []
+        with pinned_cores.lock:
+            free = [c for c in sorted(os.sched_getaffinity(0)) if c not in pinned_cores.busy]
+            if len(free) == 0:
+                return []
+            self.cores = [free[0]]
+            if self.count > 1:
+                # interactor works in turns with solution, so it may share the core if nothing else is free
+                others = [c for c in get_core_siblings(free[0]) if c in free[1:]] + free[1:] + free[:1]
+                self.cores.append(others[0])
+            pinned_cores.busy.update(self.cores)
+        return self.cores
+    def __exit__(self, *exc_info):
+        # type: (Any) -> None
+        with pinned_cores.lock:
+            pinned_cores.busy.difference_update(self.cores)
+        self.cores = []
+
+# pins just started process to given CPU core (if not None)
+# note: it is done from parent after spawn, since preexec_fn of Popen is unsafe when other threads are running (see Config.jobs)
+def pin_process(process, core):
+    # type: (psutil.Process, Optional[int]) -> None
+    if core is None:
+        return
+    try:
+        os.sched_setaffinity(process.pid, [core])
+    except OSError:     # process has already finished
+        pass
+
 # controls execution of several processes just started via psutil.Popen (until all of them terminate)
 # processes - list of process handles returned from psutil.Popen
 # time_limits, memory_limits - lists of values, same-indexed as processes:
@@ -610,23 +955,44 @@ def proclaim_process_runs(popen_args, time_limits, memory_limits, quiet = False)
 #    exit_code: exit code returned by process on termination
 #    time: how much CPU time was spent (in seconds)
 #    memory: peak memory consumption (in MB)
+#    wait_time: time spent waiting for CPU in run queue (in seconds), sampled while process runs (zero if unknown)
 # if deadpipe_guard is set, then all remaining processes will be terminated (with 'K' verdict) if they all seem to wait 
 # this happens if idle time elapsed since last process termination is greater than deadpipe_guard for all alive processes
-def control_processes_execution(processes, time_limits, memory_limits, deadpipe_guard = None, quiet = False):
-    # type: (List[psutil.Process], List[Optional[float]], List[Optional[float]], Optional[float], bool) -> List[RunResult]
+# if use_wait4_supervision is set, then processes are reaped with os.wait4 and supervisor sleeps until some process terminates:
+#    time is taken from kernel at exit (exact), memory is peak RSS from kernel (see reap_process_wait4)
+#    polling is used only to enforce limits while processes are running
+# cgroups is a list of cgroup paths same-indexed as processes (None if process is not in separate cgroup, see run_cgroup)
+#    for such processes, time and anonymous memory are measured by cgroup (including all children), 'M' verdict is also given on OOM kill
+def control_processes_execution(processes, time_limits, memory_limits, deadpipe_guard = None, quiet = False, cgroups = None):
+    # type: (List[psutil.Process], List[Optional[float]], List[Optional[float]], Optional[float], bool, Optional[List[Optional[str]]]) -> List[RunResult]
     k = len(processes)
+    if cgroups is None:
+        cgroups = [None] * k
     verdicts = [None] * k       # type: List[Optional[str]]
     exit_codes = [None] * k     # type: List[Optional[int]]
     max_cpu_time = [0.0] * k
     max_memory = [0.0] * k
+    wait_times = [0.0] * k
 
-    def handle_process_termination(proc):
-        # type: (psutil.Process) -> None
-        i = processes.index(proc)
+    # takes resource usage of i-th process from its cgroup
+    def update_from_cgroup(i, final):
+        # type: (int, bool) -> None
+        cgroup = cgroups[i] if cgroups is not None else None
+        if cgroup is None:
+            return
+        (cpu_time, anon_memory, oom_killed) = read_cgroup_usage(cgroup)
+        max_cpu_time[i] = max(max_cpu_time[i], cpu_time)
+        max_memory[i] = max(max_memory[i], anon_memory)
+        if final and oom_killed and verdicts[i] is None:
+            verdicts[i] = 'M'
+
+    def handle_process_termination(i, ec):
+        # type: (int, Optional[int]) -> None
         if exit_codes[i] is not None:
             return # already terminated earlier
-        ec = exit_codes[i] = processes[i].returncode
         assert(ec is not None)
+        update_from_cgroup(i, True)
+        exit_codes[i] = ec
         ver = verdicts[i]
         printq(quiet, "%d: %s (err = %d, mem = %s MB, time = %s sec)" % (
             i,
@@ -638,68 +1004,134 @@ def control_processes_execution(processes, time_limits, memory_limits, deadpipe_
         if verdicts[i] is None:
             verdicts[i] = ('A' if exit_codes[i] == 0 else 'R')
 
+    # reaps i-th process if it has terminated, taking its resource usage from kernel
+    def reap_process_wait4(i):
+        # type: (int) -> None
+        try:
+            pid, status, rusage = os.wait4(processes[i].pid, os.WNOHANG)
+        except OSError:             # reaped by someone else?..
+            # exit status and resource usage are lost, so the run cannot be trusted
+            printq(quiet, "%d: %s" % (i, colored_verdict('R', "Failed to reap process, its exit status is unknown")))
+            setattr(getattr(processes[i], '_Popen__subproc', processes[i]), 'returncode', -1)
+            if verdicts[i] is None:
+                verdicts[i] = 'R'
+            handle_process_termination(i, -1)
+            return
+        if pid == 0:
+            return
+        ec = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+        # tell subprocess that process is reaped, so that it never waits for this pid (which can be reused)
+        setattr(getattr(processes[i], '_Popen__subproc', processes[i]), 'returncode', ec)
+        if rusage is not None:
+            max_cpu_time[i] = max(max_cpu_time[i], rusage.ru_utime)
+            # ru_maxrss includes peak RSS of the parent process inherited before exec
+            # so we can trust it only if it is greater than our own peak memory
+            own_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            if rusage.ru_maxrss > own_peak:
+                max_memory[i] = max(max_memory[i], rusage.ru_maxrss / 2**10)
+        tl, ml = time_limits[i], memory_limits[i]
+        if verdicts[i] is None and tl is not None and max_cpu_time[i] > tl:
+            verdicts[i] = 'T'
+        if verdicts[i] is None and ml is not None and max_memory[i] > ml:
+            verdicts[i] = 'M'
+        handle_process_termination(i, ec)
+
+    def is_alive(i):
+        # type: (int) -> bool
+        return exit_codes[i] is None and processes[i].is_running()
+
+    pidfds = [None] * k         # type: List[Optional[int]]
+    if use_wait4_supervision:
+        pidfds = [open_process_fd(p.pid) for p in processes]
+    poll_interval = 0.05 if use_wait4_supervision else 0.01
     start_real_time = time.time()
     last_alive_count = k
-    while True:
-        try:
-            gone, alive = psutil.wait_procs(processes, 0.01, handle_process_termination)
-            if len(alive) > 0:
-                raise psutil.TimeoutExpired(0)
-            break
-        except psutil.TimeoutExpired:
-            for i in range(k):
-                process = processes[i]
-                tl, ml = time_limits[i], memory_limits[i]
-                if not process.is_running():
-                    continue
-                try:
-                    max_cpu_time[i] = max(max_cpu_time[i], process.cpu_times().user)
-                    max_memory[i] = max(max_memory[i], process.memory_info().rss / (2**20))
-                    if tl is not None and max_cpu_time[i] > tl:
-                        verdicts[i] = 'T'
-                        process.terminate()
-                        continue
-                    if ml is not None and max_memory[i] > ml:
-                        verdicts[i] = 'M'
-                        process.terminate()
+    try:
+        while True:
+            try:
+                if use_wait4_supervision:
+                    for i in range(k):
+                        if exit_codes[i] is None:
+                            reap_process_wait4(i)
+                    alive = [i for i in range(k) if exit_codes[i] is None]
+                else:
+                    gone, alive_procs = psutil.wait_procs(processes, poll_interval, lambda p: handle_process_termination(processes.index(p), p.returncode))
+                    alive = [processes.index(p) for p in alive_procs]
+                if len(alive) == 0:
+                    break
+
+                for i in range(k):
+                    process = processes[i]
+                    tl, ml = time_limits[i], memory_limits[i]
+                    if not is_alive(i):
                         continue
-                    if tl is not None and time.time() - start_real_time > (tl * 3 + 1):
-                        verdicts[i] = 'D'
-                        process.terminate()
+                    try:
+                        max_cpu_time[i] = max(max_cpu_time[i], process.cpu_times().user)
+                        max_memory[i] = max(max_memory[i], process.memory_info().rss / (2**20))
+                        if use_wait4_supervision:
+                            max_memory[i] = max(max_memory[i], read_peak_memory_linux(process.pid) or 0.0)
+                        wait_times[i] = max(wait_times[i], read_run_delay_linux(process.pid) or 0.0)
+                        update_from_cgroup(i, False)
+                        if tl is not None and max_cpu_time[i] > tl:
+                            verdicts[i] = 'T'
+                            process.terminate()
+                            continue
+                        if ml is not None and max_memory[i] > ml:
+                            verdicts[i] = 'M'
+                            process.terminate()
+                            continue
+                        if tl is not None and time.time() - start_real_time > (tl * 3 + 1):
+                            verdicts[i] = 'D'
+                            process.terminate()
+                            continue
+                    except psutil.NoSuchProcess: # finished when we checked/terminated it
                         continue
-                except psutil.NoSuchProcess: # finished when we checked/terminated it
-                    continue
 
-            if deadpipe_guard is not None and len(alive) < k:   #note: only for interactive problems!
-                idle_time = [time.time() - start_real_time - max_cpu_time[i] for i in range(k)]
-                if len(alive) < last_alive_count:
-                    last_alive_count = len(alive)
-                    last_idle_time = idle_time[:]
-                # alive processes with very small idle time after last process termination:
-                still_working = list(filter(lambda i: processes[i].is_running() and idle_time[i] - last_idle_time[i] < deadpipe_guard, range(k))) # type: ignore
-                if len(still_working) == 0:
-                    for i in range(k):
-                        if processes[i].is_running():
-                            verdicts[i] = 'K'
-                            try:
-                                processes[i].terminate()
-                            except psutil.NoSuchProcess:
-                                continue
-
-        except psutil.NoSuchProcess:    # is it possible?
-            break
-        except psutil.AccessDenied:     # perhaps OSX-specific
-            printq(quiet, "Access denied error (perhaps try sudo/admin)")
-
-    res = [RunResult(verdicts[i], exit_codes[i], max_cpu_time[i], max_memory[i]) for i in range(k)] # type: ignore
+                if deadpipe_guard is not None and len(alive) < k:   #note: only for interactive problems!
+                    idle_time = [time.time() - start_real_time - max_cpu_time[i] for i in range(k)]
+                    if len(alive) < last_alive_count:
+                        last_alive_count = len(alive)
+                        last_idle_time = idle_time[:]
+                    # alive processes with very small idle time after last process termination:
+                    still_working = list(filter(lambda i: is_alive(i) and idle_time[i] - last_idle_time[i] < deadpipe_guard, range(k)))
+                    if len(still_working) == 0:
+                        for i in range(k):
+                            if is_alive(i):
+                                verdicts[i] = 'K'
+                                try:
+                                    processes[i].terminate()
+                                except psutil.NoSuchProcess:
+                                    continue
+
+                if use_wait4_supervision:
+                    # sleep until some process terminates, or until it is time to check limits again
+                    fds = [fd for i,fd in enumerate(pidfds) if fd is not None and exit_codes[i] is None]
+                    if len(fds) > 0:
+                        select.select(fds, [], [], poll_interval)
+                    else:
+                        time.sleep(poll_interval)
+
+            except psutil.NoSuchProcess:    # is it possible?
+                break
+            except psutil.AccessDenied:     # perhaps OSX-specific
+                printq(quiet, "Access denied error (perhaps try sudo/admin)")
+    finally:
+        for fd in pidfds:
+            if fd is not None:
+                os.close(fd)
+
+    res = [RunResult(verdicts[i], exit_codes[i], max_cpu_time[i], max_memory[i], False, [max_cpu_time[i]], wait_times[i]) for i in range(k)] # type: ignore
     return res
 
 # runs a solution by name (either an executable file or java class)
 # if "solution" is a list, then it is run directly via Popen
 # parameters and results as in controlled_run
 # if interactive = True, then solution is run connected to interactor
-def controlled_run_solution(solution, time_limit, memory_limit, interactive, quiet = False):
-    # type: (Union[str, List[str]], Optional[float], Optional[float], bool, bool) -> RunResult
+# workdir is the directory where the solution is run and where input.txt/output.txt/etc. are located
+# if pin_cpu = True, then solution (and interactor) are pinned to dedicated CPU cores if possible (see pinned_cores)
+# if stdin_fd is set, then solution reads stdin from this file descriptor (from its beginning) instead of input.txt
+def controlled_run_solution(solution, time_limit, memory_limit, interactive, quiet = False, workdir = '.', pin_cpu = False, stdin_fd = None):
+    # type: (Union[str, List[str]], Optional[float], Optional[float], bool, bool, str, bool, Optional[int]) -> RunResult
     corrected_memory_limit = memory_limit
     if not isinstance(solution, str):
         popen_args = solution       # type: Union[str, List[str]]
@@ -725,16 +1157,21 @@ def controlled_run_solution(solution, time_limit, memory_limit, interactive, qui
     if interactive:
         interactor_name = 'interactor'
         interactor_args = [interactor_name if os.name == 'nt' else path.join('./', interactor_name), 'input.txt', 'output.txt']
-        if path.isfile('answer.txt'):
+        if path.isfile(path.join(workdir, 'answer.txt')):
             interactor_args.append('answer.txt')
         args_list = [interactor_args, popen_args]
         TLs = [time_limit * 2 + 5, time_limit] if time_limit is not None else [None, None]                  # type: List[Optional[float]]
         MLs = [memory_limit + 256, corrected_memory_limit] if memory_limit is not None else [None, None]    # type: List[Optional[float]]
 
         proclaim_process_runs(args_list, TLs, MLs, quiet)
-        process_inter = psutil.Popen(interactor_args, stdin = subprocess.PIPE, stdout = subprocess.PIPE)
-        process_sol = psutil.Popen(popen_args, stdin = process_inter.stdout, stdout = process_inter.stdin)
-        inter_res, sol_res = control_processes_execution([process_inter, process_sol], TLs, MLs, 0.5, quiet)
+        with run_cgroup(MLs[0]) as cg_inter, run_cgroup(MLs[1]) as cg_sol, pinned_cores(2 if pin_cpu else 0) as cores:
+            core_sol, core_inter = cores if len(cores) == 2 else (None, None)
+            process_inter = psutil.Popen(interactor_args, stdin = subprocess.PIPE, stdout = subprocess.PIPE, cwd = workdir, preexec_fn = cg_inter.move_self if cg_inter else None)
+            pin_process(process_inter, core_inter)
+            process_sol = psutil.Popen(popen_args, stdin = process_inter.stdout, stdout = process_inter.stdin, cwd = workdir, preexec_fn = cg_sol.move_self if cg_sol else None)
+            pin_process(process_sol, core_sol)
+            cgroups = [cg_inter.path if cg_inter else None, cg_sol.path if cg_sol else None]
+            inter_res, sol_res = control_processes_execution([process_inter, process_sol], TLs, MLs, 0.5, quiet, cgroups)
 
         exitcode_verdict = get_verdict_for_checker_code(inter_res.exit_code)
         assert(inter_res.verdict != 'K' or sol_res.verdict != 'K')
@@ -752,18 +1189,96 @@ def controlled_run_solution(solution, time_limit, memory_limit, interactive, qui
         return sol_res._replace(verdict = exitcode_verdict)
     else:
         proclaim_process_runs([popen_args], [time_limit], [corrected_memory_limit], quiet)
-        cmin = open("input.txt", "rb") if enable_stdin_redirection else null_context(None)       # type: Any
+        if stdin_fd is not None:
+            os.lseek(stdin_fd, 0, os.SEEK_SET)
+            cmin = null_context(stdin_fd)       # type: Any
+        else:
+            cmin = open(path.join(workdir, "input.txt"), "rb") if enable_stdin_redirection else null_context(None)
         with cmin as fin:
-            cmout = open("_stdout_", "wb") if enable_stdout_redirection else null_context(None)   # type: Any
+            cmout = open(path.join(workdir, "_stdout_"), "wb") if enable_stdout_redirection else null_context(None)   # type: Any
             with cmout as fout:
-                cmerr = open("_stderr_", "wb") if enable_stderr_redirection else null_context(None) # type: Any
-                with cmerr as ferr:
-                    process = psutil.Popen(popen_args, stdin = fin, stdout = fout, stderr = ferr)
-                    res = control_processes_execution([process], [time_limit], [corrected_memory_limit], None, quiet)
+                cmerr = open(path.join(workdir, "_stderr_"), "wb") if enable_stderr_redirection else null_context(None) # type: Any
+                with cmerr as ferr, run_cgroup(corrected_memory_limit) as cg, pinned_cores(1 if pin_cpu else 0) as cores:
+                    process = psutil.Popen(popen_args, stdin = fin, stdout = fout, stderr = ferr, cwd = workdir, preexec_fn = cg.move_self if cg else None)
+                    pin_process(process, cores[0] if len(cores) > 0 else None)
+                    res = control_processes_execution([process], [time_limit], [corrected_memory_limit], None, quiet, [cg.path if cg else None])
         return res[0]
 
 ############################## Diffs and checkers ##############################
 
+# whitespace characters separating tokens (same as used by bytes.split)
+token_whitespace = b' \t\n\r\x0b\x0c'
+token_regex = re.compile(b'[^' + re.escape(token_whitespace) + b']+')
+
+# reads file in chunks of given size, and yields tokens of each chunk as triple:
+# (file offset of chunk start, chunk data, list of tokens in chunk)
+# every chunk is cut after its last whitespace, so that tokens are never split between chunks
+def read_token_chunks(f, chunk_size):
+    # type: (IO[bytes], int) -> Iterator[Tuple[int, bytes, List[bytes]]]
+    offset = 0
+    carry = b''
+    while True:
+        block = f.read(chunk_size)
+        data = carry + block
+        if len(block) == 0:
+            if len(data) > 0:
+                yield (offset, data, data.split())
+            return
+        cut = max(data.rfind(c) for c in [token_whitespace[i:i+1] for i in range(len(token_whitespace))]) + 1
+        if cut == 0:
+            carry = data    # very long token, read more
+            continue
+        yield (offset, data[:cut], data[:cut].split())
+        offset += cut
+        carry = data[cut:]
+
+# position of the first mismatch between files: token index, byte offset in first file, and whether one of files ended
+TokenMismatch = NamedTuple('TokenMismatch', [('index', int), ('offset', int), ('premature_end', bool)])
+
+# returns index of first pair of different tokens in two lists of same length (or their length if all are equal)
+def find_first_token_difference(a_tokens, b_tokens):
+    # type: (List[bytes], List[bytes]) -> int
+    if a_tokens == b_tokens:
+        return len(a_tokens)
+    k = 0
+    while a_tokens[k] == b_tokens[k]:
+        k += 1
+    return k
+
+# compares two files with given names (paths) as streams of tokens, holding only one chunk of each file in memory
+# returns None if they are equal, otherwise TokenMismatch describing the first mismatch
+# if first file has less tokens, mismatch is reported at its end (token index = number of its tokens, offset = its size)
+# compare is a function used to find the first mismatch in lists of tokens (see find_first_token_difference)
+def find_first_token_mismatch(ap, bp, chunk_size = 2**20, compare = find_first_token_difference):
+    # type: (str, str, int, Callable[[List[bytes], List[bytes]], int]) -> Optional[TokenMismatch]
+    with open(ap, "rb") as af, open(bp, "rb") as bf:
+        a_chunks, b_chunks = read_token_chunks(af, chunk_size), read_token_chunks(bf, chunk_size)
+        empty = (0, b'', [])    # type: Tuple[int, bytes, List[bytes]]
+        a_chunk, b_chunk = empty, empty
+        a_pos, b_pos = 0, 0     # index of current token in chunk
+        a_index = 0             # index of first token of current chunk in whole file
+        while True:
+            # take next chunks with tokens (chunk stays empty at end of file)
+            while a_pos == len(a_chunk[2]):
+                a_index += a_pos
+                a_chunk, a_pos = next(a_chunks, empty), 0
+                if a_chunk is empty:
+                    break
+            while b_pos == len(b_chunk[2]):
+                b_chunk, b_pos = next(b_chunks, empty), 0
+                if b_chunk is empty:
+                    break
+            a_tokens, b_tokens = a_chunk[2], b_chunk[2]
+            n = min(len(a_tokens) - a_pos, len(b_tokens) - b_pos)
+            if n == 0 and len(a_tokens) == 0:
+                return None if len(b_tokens) == 0 else TokenMismatch(a_index, af.tell(), True)
+            k = compare(a_tokens[a_pos:a_pos+n], b_tokens[b_pos:b_pos+n]) if n > 0 else 0
+            if k < n or n == 0:
+                match = next(itertools.islice(token_regex.finditer(a_chunk[1]), a_pos + k, None))
+                return TokenMismatch(a_index + a_pos + k, a_chunk[0] + match.start(), n == 0)
+            a_pos += n
+            b_pos += n
+
 # returns whether two files with given names (paths) are equal as streams of tokens
 # can be used as built-in replacement for wcmp.cpp checker from testlib distribution
 # note that it works a bit different from standard commands fc/diff
@@ -771,11 +1286,7 @@ def controlled_run_solution(solution, time_limit, memory_limit, interactive, qui
 def is_file_diff_empty(ap, bp):
     # type: (str, str) -> bool
     try:
-        with open(ap, "rb") as af:
-            with open(bp, "rb") as bf:
-                a_tokens = af.read().split()
-                b_tokens = bf.read().split()
-                return a_tokens == b_tokens
+        return find_first_token_mismatch(ap, bp) is None
     except IOError:
         return False
 
@@ -794,21 +1305,122 @@ def get_verdict_for_checker_code(errcode):
         return 'W'  # still can be a valid return
     return 'J'      # most likely a crash
 
+# total resources used by all runs of checker executable (see run_checker)
+# memo_hits is the number of times checker was not run because its verdict was known (see CheckerMemo)
+checker_usage = {'runs': 0, 'time': 0.0, 'max_time': 0.0, 'max_memory': 0.0, 'memo_hits': 0}
+checker_usage_lock = threading.Lock()
+
+# returns human-readable summary of checker_usage
+def format_checker_usage():
+    # type: () -> str
+    return "Checker was run %d times: total time %0.2f s, max time %0.2f s, max memory %0.1f MB%s" % (
+        checker_usage['runs'], checker_usage['time'], checker_usage['max_time'], checker_usage['max_memory'],
+        " (%d more verdicts taken from memo)" % checker_usage['memo_hits'] if checker_usage['memo_hits'] > 0 else "")
+
 # runs checker and returns its opinion on the output file
 # returns 'A' if output is correct, and 'W'/'P'/'J' otherwise
 # Note: CWD must be equal to the problem directory
-# Data taken from files:
+# Data taken from files (located in workdir):
 #   'input.txt' - input data
 #   'answer.txt' - jury's output data
 #   'output.txt' - contestant's output data
-def run_checker(quiet = False):
-    # type: (bool) -> str
-    if if_exe_exists('check'):
-        errcode = cmd_runner(quiet)('./check input.txt output.txt answer.txt').returncode
+# if workdir is not the problem directory, then checker executable must be present in it too
+# if numeric tolerance is set for the problem (see read_checker_tolerance), then built-in checker is used instead of checker executable
+# time and memory used by checker executable are measured and accounted in checker_usage
+# if memo is given, then checker executable is not run if its verdict for same files is known (see CheckerMemo)
+def run_checker(quiet = False, workdir = '.', memo = None):
+    # type: (bool, str, Optional[CheckerMemo]) -> str
+    tolerance = read_checker_tolerance()
+    if if_exe_exists('check') and tolerance is None:
+        memo_key = memo.get_key(workdir) if memo is not None else None
+        if memo is not None and memo_key is not None:
+            verdict = memo.lookup(memo_key)
+            if verdict is not None:
+                printq(quiet, "Checker verdict is known: %s" % colored_verdict(verdict))
+                with checker_usage_lock:
+                    checker_usage['memo_hits'] += 1
+                return verdict
+        checker_args = ['check' if os.name == 'nt' else path.join('./', 'check'), 'input.txt', 'output.txt', 'answer.txt']
+        with open(os.devnull, 'wb') if quiet else null_context(None) as fnull:
+            process = psutil.Popen(checker_args, stdout = fnull, stderr = fnull, cwd = workdir)
+            res = control_processes_execution([process], [None], [None], None, True)[0]
+        errcode = res.exit_code
+        printq(quiet, "Checker finished (err = %d, mem = %s MB, time = %s sec)" % (errcode, color_highlight("%0.1f" % res.memory), color_highlight("%0.2f" % res.time)))
+        with checker_usage_lock:
+            checker_usage['runs'] += 1
+            checker_usage['time'] += res.time
+            checker_usage['max_time'] = max(checker_usage['max_time'], res.time)
+            checker_usage['max_memory'] = max(checker_usage['max_memory'], res.memory)
+        if memo is not None and memo_key is not None:
+            memo.store(memo_key, get_verdict_for_checker_code(errcode))
     else:
-        errcode = 0 if is_file_diff_empty('output.txt', 'answer.txt') else 1
+        errcode = run_builtin_checker(path.join(workdir, 'output.txt'), path.join(workdir, 'answer.txt'), tolerance, quiet)
     return get_verdict_for_checker_code(errcode)
 
+# reads settings of built-in checker for the problem from builtin_checker_file (see nsuolymp_cfg.py) in problem directory
+# line "numeric EPS" means numbers are compared with absolute or relative error EPS (like rcmp checker of testlib)
+# line "numeric ABS REL" sets absolute and relative errors separately
+# returns pair (absolute error, relative error), or None if file is absent (then tokens are compared exactly)
+def read_checker_tolerance():
+    # type: () -> Optional[Tuple[float, float]]
+    data = read_file_contents(builtin_checker_file)
+    if data is None:
+        return None
+    words = data.split()
+    try:
+        if len(words) in [2, 3] and words[0] == b'numeric':
+            return (float(words[1]), float(words[-1]))
+    except ValueError:
+        pass
+    raise Exception("cannot parse %s: expected 'numeric EPS' or 'numeric ABS REL'" % builtin_checker_file)
+
+# returns index of first pair of different tokens in two lists of same length (or their length if all are equal)
+# numeric tokens are equal if they differ by at most abs_eps or by at most rel_eps relative to the second one
+# if numpy is available, then lists of numbers are parsed and compared in bulk
+def find_first_numeric_difference(a_tokens, b_tokens, abs_eps, rel_eps):
+    # type: (List[bytes], List[bytes], float, float) -> int
+    if numpy is not None:
+        try:
+            a = numpy.array(a_tokens).astype(numpy.float64)
+            b = numpy.array(b_tokens).astype(numpy.float64)
+        except ValueError:
+            pass    # there are non-numeric tokens, compare them one by one
+        else:
+            with numpy.errstate(invalid = 'ignore'):
+                ok = (a == b) | (numpy.abs(a - b) <= numpy.maximum(abs_eps, rel_eps * numpy.abs(b))) | (numpy.isnan(a) & numpy.isnan(b))
+            bad = numpy.flatnonzero(~ok)
+            return int(bad[0]) if len(bad) > 0 else len(a_tokens)
+    for k in range(len(a_tokens)):
+        if a_tokens[k] == b_tokens[k]:
+            continue
+        try:
+            x, y = float(a_tokens[k]), float(b_tokens[k])
+        except ValueError:
+            return k
+        if not (x == y or abs(x - y) <= max(abs_eps, rel_eps * abs(y)) or (x != x and y != y)):
+            return k
+    return len(a_tokens)
+
+# compares output file with answer file as streams of tokens (see find_first_token_mismatch)
+# if tolerance is given as pair (absolute error, relative error), then numeric tokens are compared approximately
+# returns exit code of testlib-style checker: 0 if output is correct, 1 if it is wrong
+# in numeric mode 2 (presentation error) is returned if number of tokens differs
+def run_builtin_checker(output_file, answer_file, tolerance = None, quiet = False):
+    # type: (str, str, Optional[Tuple[float, float]], bool) -> int
+    compare = find_first_token_difference      # type: Callable[[List[bytes], List[bytes]], int]
+    if tolerance is not None:
+        (abs_eps, rel_eps) = tolerance
+        compare = lambda a, b: find_first_numeric_difference(a, b, abs_eps, rel_eps)
+    try:
+        mismatch = find_first_token_mismatch(output_file, answer_file, compare = compare)
+    except IOError:
+        printq(quiet, "Output or answer file is missing")
+        return 1
+    if mismatch is None:
+        return 0
+    printq(quiet, "Output differs from answer at token %d (byte offset %d)" % (mismatch.index, mismatch.offset))
+    return 2 if tolerance is not None and mismatch.premature_end else 1
+
 ################################### Archives ###################################
 
 # finds 7-zip command line executable
@@ -851,12 +1463,491 @@ def create_flat_zip(input_files, output_file, quiet = False, level = 3, password
     err = cmd_runner(quiet)(cmdline).returncode
     return err == 0
 
+############################### Parallel execution #############################
+
+# returns list of files (and directories) necessary to run given program
+# program must be specified without extension (see is_solution)
+def get_program_files(program):
+    # type: (str) -> List[str]
+    candidates = [program, program + '.exe', program + '.class', program + '.jar', program + '.py']
+    files = [f for f in candidates if path.exists(f)]
+    files += glob.glob(program + '$*.class')   # nested java classes
+    return files
+
+# returns hash of all files necessary to run given program (None if there are no such files)
+def hash_program(program):
+    # type: (str) -> Optional[str]
+    files = []      # type: List[str]
+    for f in get_program_files(program):
+        if path.isdir(f):
+            files += sorted(glob.glob(path.join(f, '*')))
+        else:
+            files.append(f)
+    if len(files) == 0:
+        return None
+    return hash_data([(path.basename(f), hash_file(f)) for f in files])
+
+# puts a file or directory into given directory, preferring hard link over copying
+def link_into_directory(src, dst_dir):
+    # type: (str, str) -> None
+    dst = path.join(dst_dir, path.basename(src))
+    if path.isdir(src):
+        shutil.copytree(src, dst)
+        return
+    try:
+        os.link(src, dst)
+    except (OSError, AttributeError):   # no hard links on this FS / OS
+        shutil.copy2(src, dst)
+
+# returns directory where sandboxes and other intermediate files are put
+# it is either problem directory (CWD), or directory private to this process in cfg.scratch (see scratch_root in config)
+def get_scratch_directory(cfg):
+    # type: (Config) -> str
+    if cfg.scratch is None:
+        return '.'
+    return path.join(cfg.scratch, 'nsuolymp_%s_%d' % (path.basename(os.getcwd()), os.getpid()))
+
+# returns directory where persistent state of the current problem is kept (see state_root in config)
+def get_state_directory():
+    # type: () -> str
+    root = state_root if state_root is not None else path.join(path.expanduser('~'), '.cache', 'nsuolymp')
+    if not path.isabs(root):
+        return root
+    problem = path.abspath(os.getcwd())
+    return path.join(root, '%s_%s' % (path.basename(problem), hash_data(problem)[:10]))
+
+# returns directory where failed runs of the current problem are kept for inspection (see keep_failed_run)
+def get_failed_runs_directory(cfg):
+    # type: (Config) -> Optional[str]
+    if cfg.scratch is None:
+        return None
+    return path.join(cfg.scratch, 'nsuolymp_failed', path.basename(os.getcwd()))
+
+# creates empty sandbox directory with given index, where programs can run without interfering with each other
+# all the given programs (usually solutions) are linked into it, along with checker and interactor
+# sandbox is created in scratch directory (see get_scratch_directory)
+# returns path to the sandbox directory
+# Note: CWD must be equal to the problem directory
+def create_sandbox(cfg, index, programs):
+    # type: (Config, int, List[str]) -> str
+    scratch = get_scratch_directory(cfg)
+    sandbox = path.join(scratch, '_sandbox_%d' % index)
+    remove_sandbox(sandbox)
+    if not path.isdir(scratch):
+        os.makedirs(scratch)
+    os.mkdir(sandbox)
+    for prog in programs + ['check', 'interactor']:
+        for f in get_program_files(prog):
+            link_into_directory(f, sandbox)
+    return sandbox
+
+# deletes sandbox directory with all its contents
+# scratch directory is also deleted when its last sandbox is deleted (unless it is problem directory)
+def remove_sandbox(sandbox):
+    # type: (str) -> None
+    if path.isdir(sandbox):
+        shutil.rmtree(sandbox)
+    scratch = path.dirname(sandbox)
+    if path.basename(scratch).startswith('nsuolymp_'):
+        try:
+            os.rmdir(scratch)
+        except OSError:     # still not empty
+            pass
+
+# returns names of all data files of a run (inputs, outputs, etc.), some of them may be absent
+def get_run_data_files():
+    # type: () -> List[str]
+    return list(set(['input.txt', 'output.txt', 'answer.txt', '_stdout_', '_stderr_'] + list(read_filenames())))
+
+# moves all data files of a run from one directory to another (replacing existing ones)
+def move_run_data_files(src_dir, dst_dir):
+    # type: (str, str) -> None
+    for f in get_run_data_files():
+        removefile(path.join(dst_dir, f))
+        if path.isfile(path.join(src_dir, f)):
+            os.rename(path.join(src_dir, f), path.join(dst_dir, f))
+
+# saves data files of a failed run in sandbox (inputs, outputs, etc.) for inspection
+# they are put into a subdirectory of get_failed_runs_directory, named after solution and test
+# does nothing if there is no scratch directory (then files are left in the problem directory, see check_solution)
+def keep_failed_run(cfg, workdir, solution, input_file):
+    # type: (Config, str, str, str) -> None
+    failed_dir = get_failed_runs_directory(cfg)
+    if failed_dir is None or workdir == '.':
+        return
+    test_name = path.splitext(path.basename(input_file))[0]
+    keep_dir = path.join(failed_dir, '%s_%s' % (path.basename(solution), test_name))
+    if path.isdir(keep_dir):
+        shutil.rmtree(keep_dir)
+    os.makedirs(keep_dir)
+    for f in get_run_data_files():
+        if path.isfile(path.join(workdir, f)):
+            shutil.copyfile(path.join(workdir, f), path.join(keep_dir, f))
+    printq(cfg.quiet, "Failed run kept in %s" % keep_dir)
+
+# total usage of all worker pools run by run_parallel_jobs (times in seconds)
+# wall: time from start of pool until all its workers finished, busy: total time spent by workers in work calls
+# available: sum of wall times multiplied by number of workers
+pool_usage = {'pools': 0, 'wall': 0.0, 'busy': 0.0, 'available': 0.0}
+pool_usage_lock = threading.Lock()
+
+# calls work(worker, item) for every item, using jobs_count worker threads
+# worker is index of the thread in [0..jobs_count), so that each worker can own its resources (e.g. sandbox)
+# items are dispatched to free workers from a common queue in the given order
+# returns list of results, same-indexed as items
+# if any work call raises an exception, remaining items are not started and the exception is reraised
+# time spent by workers is accounted in pool_usage
+def run_parallel_jobs(jobs_count, items, work):
+    # type: (int, List[Any], Callable[[int, Any], Any]) -> List[Any]
+    results = [None] * len(items)      # type: List[Any]
+    errors = []                        # type: List[BaseException]
+    lock = threading.Lock()
+    next_item = [0]
+    busy_time = [0.0]
+    def worker_loop(worker):
+        # type: (int) -> None
+        while True:
+            with lock:
+                i = next_item[0]
+                if i >= len(items) or len(errors) > 0:
+                    return
+                next_item[0] += 1
+            start_time = time.time()
+            try:
+                results[i] = work(worker, items[i])
+            except BaseException as e:
+                with lock:
+                    errors.append(e)
+                return
+            finally:
+                with lock:
+                    busy_time[0] += time.time() - start_time
+    start_time = time.time()
+    threads = [threading.Thread(target = worker_loop, args = (w,)) for w in range(min(jobs_count, len(items)))]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    for t in threads:
+        while t.is_alive():
+            t.join(0.1)     # with timeout to remain responsive to Ctrl+C
+    wall_time = time.time() - start_time
+    with pool_usage_lock:
+        pool_usage['pools'] += 1
+        pool_usage['wall'] += wall_time
+        pool_usage['busy'] += busy_time[0]
+        pool_usage['available'] += wall_time * len(threads)
+    if len(errors) > 0:
+        raise errors[0]
+    return results
+
+# returns human-readable summary of pool_usage
+def format_pool_usage():
+    # type: () -> str
+    available = pool_usage['available']
+    return "Workers were busy %0.0f%% of time (%0.1f s of %0.1f s available, %0.1f s elapsed)" % (
+        100.0 * pool_usage['busy'] / available if available > 0.0 else 100.0,
+        pool_usage['busy'], available, pool_usage['wall']
+    )
+
+# returns estimated costs of running solution on each of given tests (same-indexed as tests, in seconds if possible)
+# typical times from cfg.test_stats are used where known, other tests are estimated by size of their input files
+# sizes are converted to seconds by the ratio of known times to sizes of the same tests (if there are any)
+def estimate_tests_costs(cfg, tests):
+    # type: (Config, List[str]) -> List[float]
+    sizes = [max(getfilesize(f), 0) + 1.0 for f in tests]
+    times = [cfg.test_stats.get_typical_time(f) if cfg.test_stats is not None else None for f in tests]
+    known_time = sum(t for t in times if t is not None)
+    known_size = sum(sizes[i] for i,t in enumerate(times) if t is not None)
+    seconds_per_byte = known_time / known_size if known_time > 0.0 else 1.0
+    return [t if t is not None else sizes[i] * seconds_per_byte for i,t in enumerate(times)]
+
+################################## Result caches ###############################
+
+# persistent key-value store, kept in memory during session, and written to disk as JSON by save
+# each entry is a list of values with "clock" of its last use appended as the last element
+# the least recently used entries are evicted on save when there are more than max_size of them
+# entries with length different from entry_length (if set) are dropped on load (they come from older versions)
+class PersistentLruStore:
+    def __init__(self, filename, max_size, entry_length = None):
+        # type: (str, int, Optional[int]) -> None
+        self.filename = filename
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.entries = {}   # type: Dict[str, List[Any]]
+        self.clock = 0
+        data = read_file_contents(self.filename)
+        if data is not None:
+            try:
+                self.entries = {k: e for k,e in json.loads(data.decode('utf-8')).items() if entry_length is None or len(e) == entry_length}
+                self.clock = max([e[-1] for e in self.entries.values()] + [0])
+            except ValueError:
+                self.entries = {}   # corrupted store is simply dropped
+
+    # returns values of entry with given key (without clock), or None if there is no such key
+    def lookup_entry(self, key):
+        # type: (str) -> Optional[List[Any]]
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.clock += 1
+            entry[-1] = self.clock
+            return entry[:-1]
+
+    # saves entry with given values under given key
+    def store_entry(self, key, values):
+        # type: (str, List[Any]) -> None
+        with self.lock:
+            self.clock += 1
+            self.entries[key] = values + [self.clock]
+
+    # removes all the entries
+    def clear(self):
+        # type: () -> None
+        with self.lock:
+            self.entries = {}
+
+    # writes store to disk, evicting least recently used entries beyond max_size
+    def save(self):
+        # type: () -> None
+        with self.lock:
+            if len(self.entries) > self.max_size:
+                keys = sorted(self.entries.keys(), key = lambda k: self.entries[k][-1])
+                for k in keys[:len(self.entries) - self.max_size]:
+                    del self.entries[k]
+            if not path.isdir(path.dirname(self.filename)):
+                os.makedirs(path.dirname(self.filename))
+            write_file_contents(self.filename, json.dumps(self.entries).encode('utf-8'))
+
+# persistent cache of solution results, stored in verdicts.json in state directory of the problem (see get_state_directory)
+# results are keyed by hashes of everything which affects them (see get_run_key)
+class VerdictCache(PersistentLruStore):
+    def __init__(self, filename = None, max_size = None):
+        # type: (Optional[str], Optional[int]) -> None
+        PersistentLruStore.__init__(self, filename or path.join(get_state_directory(), 'verdicts.json'), max_size or verdict_cache_size, 7)
+
+    # returns key for run of given solution on given test with given settings
+    # it includes hashes of solution, checker/interactor, test input and answer, as well as limits and run mode
+    def get_run_key(self, cfg, solution, input_file):
+        # type: (Config, str, str) -> str
+        return hash_data([
+            hash_program(solution), hash_program('check'), hash_program('interactor'),
+            hash_file(input_file), hash_file(get_output_by_input(input_file)),
+            cfg.tl, cfg.ml, read_filenames(), read_checker_tolerance(), cfg.repeat, cfg.repeat_stat,
+            enable_stdin_redirection, enable_stdout_redirection, enable_stderr_redirection,
+        ])
+
+    # returns cached result (with cached = True) or None if there is no such key
+    def lookup(self, key):
+        # type: (str) -> Optional[RunResult]
+        entry = self.lookup_entry(key)
+        if entry is None:
+            return None
+        return RunResult(entry[0], entry[1], entry[2], entry[3], True, entry[4], entry[5])
+
+    # saves result under given key
+    # time limit verdicts and runs under CPU contention are not saved, since they depend on machine load
+    def store(self, key, res):
+        # type: (str, RunResult) -> None
+        if res.verdict in ['T', 'D'] or is_run_contended(res):
+            return
+        self.store_entry(key, [res.verdict, res.exit_code, res.time, res.memory, res.times, res.wait_time])
+
+# memo of checker verdicts, keyed by hashes of checker executable and files input.txt, output.txt, answer.txt
+# correct solutions usually print same outputs, so checker has to be run on each of them only once
+# it is stored in checker_verdicts.json in state directory
+class CheckerMemo(PersistentLruStore):
+    def __init__(self, filename = None, max_size = None):
+        # type: (Optional[str], Optional[int]) -> None
+        PersistentLruStore.__init__(self, filename or path.join(get_state_directory(), 'checker_verdicts.json'), max_size or checker_memo_size)
+
+    # returns key for running checker in given directory (None if some file is missing)
+    # files in directory are rewritten on every run, so their hashes are not memoized
+    def get_key(self, workdir):
+        # type: (str) -> Optional[str]
+        hashes = [hash_file(path.join(workdir, f), False) for f in ['input.txt', 'output.txt', 'answer.txt']]
+        if None in hashes:
+            return None
+        return hash_data([hash_program('check')] + hashes)
+
+    # returns known verdict for given key, or None if it is unknown
+    def lookup(self, key):
+        # type: (str) -> Optional[str]
+        entry = self.lookup_entry(key)
+        return str(entry[0]) if entry is not None else None
+
+    # saves verdict under given key (judge errors are not saved, since they may be caused by environment)
+    def store(self, key, verdict):
+        # type: (str, str) -> None
+        if verdict != 'J':
+            self.store_entry(key, [verdict])
+
+################################### Run history ################################
+
+# baseline timing for a single test: solution, test, baseline time, current time
+TimingChange = NamedTuple('TimingChange', [('solution', str), ('test', str), ('baseline', float), ('current', float)])
+
+# persistent database (SQLite) with all runs of solutions, see run_history_path in config
+# each run is recorded with problem, solution and test (names and hashes), verdict, time, memory, host and timestamp
+# runs are collected in memory during testing, and written to database by save
+class RunHistory:
+    def __init__(self, filename = None):
+        # type: (Optional[str]) -> None
+        self.filename = filename or run_history_path or path.join(get_state_directory(), 'history.sqlite')
+        self.problem = path.basename(os.getcwd())
+        self.host = platform.node()
+        self.lock = threading.Lock()
+        self.records = []   # type: List[Tuple[Any, ...]]
+
+    # remembers result of solution run on given test (cached results and results measured under contention are ignored)
+    def record(self, cfg, solution, input_file, res):
+        # type: (Config, str, str, RunResult) -> None
+        if res.cached or res.verdict == '.' or is_run_contended(res):
+            return
+        rec = (self.problem, path.basename(solution), hash_program(solution), input_file, hash_file(input_file),
+               res.verdict, res.time, res.memory, cfg.tl, cfg.ml, self.host, time.time())
+        with self.lock:
+            self.records.append(rec)
+
+    def connect(self):
+        # type: () -> sqlite3.Connection
+        if path.dirname(self.filename) and not path.isdir(path.dirname(self.filename)):
+            os.makedirs(path.dirname(self.filename))
+        conn = sqlite3.connect(self.filename)
+        conn.execute('''CREATE TABLE IF NOT EXISTS runs (
+            problem TEXT, solution TEXT, solution_hash TEXT, test TEXT, test_hash TEXT,
+            verdict TEXT, time REAL, memory REAL, tl REAL, ml REAL, host TEXT, timestamp REAL)''')
+        conn.execute('CREATE INDEX IF NOT EXISTS runs_key ON runs (problem, solution, test_hash, host)')
+        return conn
+
+    # compares times of runs recorded so far with the baseline from database
+    # baseline time is median time of the last history_baseline_runs previous runs of same solution on same test on this host
+    # returns list of changes greater than noise threshold (see history_noise_* in config)
+    def compare_with_baseline(self):
+        # type: () -> List[TimingChange]
+        changes = []
+        conn = self.connect()
+        try:
+            for rec in self.records:
+                (problem, solution, solution_hash, test, test_hash, verdict, cur_time) = rec[:7]
+                rows = conn.execute('SELECT time FROM runs WHERE problem = ? AND solution = ? AND test_hash = ? AND host = ? ORDER BY timestamp DESC LIMIT ?',
+                    (problem, solution, test_hash, self.host, history_baseline_runs)).fetchall()
+                if len(rows) == 0:
+                    continue
+                times = sorted(r[0] for r in rows)
+                base_time = times[len(times) // 2]
+                if abs(cur_time - base_time) > max(history_noise_floor, history_noise_threshold * base_time):
+                    changes.append(TimingChange(solution, test, base_time, cur_time))
+        finally:
+            conn.close()
+        return changes
+
+    # writes all recorded runs to database
+    def save(self):
+        # type: () -> None
+        with self.lock:
+            records = self.records
+            self.records = []
+        if len(records) == 0:
+            return
+        conn = self.connect()
+        try:
+            with conn:
+                conn.executemany('INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', records)
+        finally:
+            conn.close()
+
+# pretty-print results of RunHistory.compare_with_baseline
+def print_baseline_comparison(changes):
+    # type: (List[TimingChange]) -> None
+    if len(changes) == 0:
+        print(colored_verdict('A', "No timing changes against baseline"))
+        return
+    print(colored_verdict('T', "Timing changes against baseline:"))
+    table = []
+    for c in changes:
+        ratio = "%+0.0f%%" % ((c.current / c.baseline - 1.0) * 100.0) if c.baseline > 0.0 else "new"
+        table.append([
+            color_highlight(c.solution), c.test,
+            "%0.2f s -> %0.2f s" % (c.baseline, c.current),
+            colored_verdict('W' if c.current > c.baseline else 'A', ratio),
+        ])
+    print(draw_table_colored(table))
+
+################################## Test ordering ###############################
+
+# per-problem record of test results, used to run tests in fail-fast order (see Config.fail_fast)
+# for each test, it keeps verdict of every solution which was run on it, and typical running time
+# stored as JSON in test_order.json in state directory of the problem (see get_state_directory)
+class TestOrderStats:
+    def __init__(self, filename = None):
+        # type: (Optional[str]) -> None
+        self.filename = filename or path.join(get_state_directory(), 'test_order.json')
+        self.lock = threading.Lock()
+        self.tests = {}     # type: Dict[str, Dict[str, Any]]
+        data = read_file_contents(self.filename)
+        if data is not None:
+            try:
+                self.tests = json.loads(data.decode('utf-8'))
+            except ValueError:
+                self.tests = {}
+
+    # remembers result of solution run on given test
+    # typical time is exponential moving average of times (with weight 0.3 for the new one)
+    def update(self, solution, input_file, res):
+        # type: (str, str, RunResult) -> None
+        if res.verdict == '.':
+            return
+        with self.lock:
+            entry = self.tests.setdefault(input_file, {'time': res.time, 'verdicts': {}})
+            entry['time'] = 0.7 * entry['time'] + 0.3 * res.time
+            entry['verdicts'][path.basename(solution)] = res.verdict
+
+    # returns typical running time of solutions on given test, or None if unknown
+    def get_typical_time(self, input_file):
+        # type: (str) -> Optional[float]
+        with self.lock:
+            entry = self.tests.get(input_file)
+            return entry['time'] if entry is not None else None
+
+    # returns estimated probability that given solution fails on given test
+    # it is 1 if this solution has already failed it, otherwise it is smoothed fraction of solutions which failed it
+    def get_fail_probability(self, solution, input_file):
+        # type: (str, str) -> float
+        entry = self.tests.get(input_file)
+        if entry is None:
+            return 0.5
+        verdicts = entry['verdicts']
+        if verdicts.get(path.basename(solution), 'A') != 'A':
+            return 1.0
+        fails = len([v for v in verdicts.values() if v != 'A'])
+        return (fails + 1.0) / (len(verdicts) + 2.0)
+
+    # returns test indices (subset of all tests) sorted so that tests most likely to fail the solution in least time go first
+    # i.e. by decreasing ratio of failure probability to typical time (plus 0.05 sec of overhead per run)
+    def order_tests(self, solution, tests, indices):
+        # type: (str, List[str], List[int]) -> List[int]
+        def score(i):
+            # type: (int) -> float
+            typical_time = self.get_typical_time(tests[i]) or 0.0
+            return self.get_fail_probability(solution, tests[i]) / (typical_time + 0.05)
+        return sorted(indices, key = lambda i: (-score(i), i))
+
+    # writes record to disk (tests which no longer exist are forgotten)
+    def save(self):
+        # type: () -> None
+        with self.lock:
+            self.tests = {f: e for f,e in self.tests.items() if path.isfile(f)}
+            if not path.isdir(path.dirname(self.filename)):
+                os.makedirs(path.dirname(self.filename))
+            write_file_contents(self.filename, json.dumps(self.tests).encode('utf-8'))
+
 ##################################### Config ###################################
 
 # common configuration settings for everything
 class Config:
-    def __init__(self, quiet = False, stop = False, tl = None, ml = None, cl_flags = None, cl_order = None):
-        # type: (bool, bool, Optional[float], Optional[float], Optional[Dict[str, str]], Optional[Dict[str, List[str]]]) -> None
+    def __init__(self, quiet = False, stop = False, tl = None, ml = None, cl_flags = None, cl_order = None, jobs = 1):
+        # type: (bool, bool, Optional[float], Optional[float], Optional[Dict[str, str]], Optional[Dict[str, List[str]]], int) -> None
         # time limit on solution's cpu time (in seconds, may be None)
         self.tl = tl
         # memory limit on solution's memory (in megabytes, may be None)
@@ -869,6 +1960,36 @@ class Config:
         self.cl_flags = cl_flags
         # order of compiler preference for each language (if None, then default_compiler_order is used)
         self.cl_order = cl_order
+        # how many tests are run simultaneously (each one in its own sandbox directory)
+        self.jobs = jobs
+        # order in which parallel jobs are dispatched: 'order' (order of tests) or 'lpt' (longest first)
+        self.schedule = parallel_schedule
+        # directory where sandboxes with intermediate files are created (if None, problem directory is used)
+        self.scratch = scratch_root
+        # if set, then problematic test of stress testing is shrinked for at most this number of seconds (see shrink_stress_test)
+        self.shrink_budget = None       # type: Optional[float]
+        # whether tests generated during stress testing are passed to solutions in memory (see run_stress_iteration)
+        self.stress_in_memory = False
+        # whether checker runs in background while solution runs on the next test (only for sequential testing)
+        self.pipeline_checker = pipeline_checker
+        # how many times solution is run on each test (to get reliable time measurement)
+        self.repeat = 1
+        # which statistic of times of repeated runs is used as solution time: 'min', 'median' or 'max'
+        self.repeat_stat = repeat_time_statistic
+        # whether solution is pinned to a dedicated CPU core during each run (see pinned_cores)
+        self.pin_cpu = pin_cpu_cores
+        # cache of solution results (if None, solutions are always run)
+        self.cache = None   # type: Optional[VerdictCache]
+        # memo of checker verdicts (if None, checker is always run)
+        self.checker_memo = None    # type: Optional[CheckerMemo]
+        # database where all runs are recorded (if None, they are not recorded)
+        self.history = None # type: Optional[RunHistory]
+        # record of which tests fail solutions and how long they run (if None, nothing is recorded)
+        self.test_stats = None  # type: Optional[TestOrderStats]
+        # whether to run tests in order given by test_stats when stop=True, so that failure is found earlier
+        self.fail_fast = False
+        # manifest of generated tests (if None, all lines of generation script are executed)
+        self.gen_manifest = None    # type: Optional[GenerationManifest]
 
 ############################## User-callable functions #########################
 
@@ -876,6 +1997,74 @@ class Config:
 #  1. CWD must be the problem's directory
 #  2. cfg parameter must be a Config instance
 
+# returns statistics of times measured in repeated runs as dict with keys: min, median, max, std
+def get_time_statistics(times):
+    # type: (List[float]) -> Dict[str, float]
+    if len(times) == 0:
+        return {'min': 0.0, 'median': 0.0, 'max': 0.0, 'std': 0.0}
+    st = sorted(times)
+    k = len(st)
+    median = st[k // 2] if k % 2 == 1 else (st[k // 2 - 1] + st[k // 2]) / 2
+    mean = sum(st) / k
+    std = (sum((t - mean) ** 2 for t in st) / k) ** 0.5
+    return {'min': st[0], 'median': median, 'max': st[-1], 'std': std}
+
+# returns whether test results have time close to time limit (see borderline_time_margin in config)
+# only applies to results of repeated runs, which have median time within margin from TL
+def is_time_borderline(res, tl):
+    # type: (RunResult, Optional[float]) -> bool
+    if tl is None or len(res.times) <= 1:
+        return False
+    return abs(get_time_statistics(res.times)['median'] - tl) <= borderline_time_margin * tl
+
+# runs solution cfg.repeat times in workdir (see controlled_run_solution), and combines the results
+# time of the combined result is cfg.repeat_stat statistic over all runs, times of all runs are saved too
+# verdict is 'T' if this time exceeds TL, otherwise it is verdict of the first failed run (e.g. crashed or exceeded ML),
+# or verdict of the first run which was not terminated by time if no run failed
+# output files of that run are left in workdir
+# stdin_fd is passed to controlled_run_solution
+def run_solution_repeatedly(cfg, solution, interactive, workdir, out_fn, stdin_fd = None):
+    # type: (Config, str, bool, str, str, Optional[int]) -> RunResult
+    res = controlled_run_solution(solution, cfg.tl, cfg.ml, interactive, cfg.quiet, workdir, cfg.pin_cpu, stdin_fd)
+    if cfg.repeat <= 1:
+        return res
+    out_files = [path.join(workdir, f) for f in set([out_fn, 'output.txt', '_stdout_', '_stderr_'])]
+    def keep_outputs():
+        # type: () -> None
+        for f in out_files:
+            removefile(f + '.kept')
+            if path.isfile(f):
+                os.rename(f, f + '.kept')
+    # failure of any run is more important than success, and success is more important than TL
+    def rank(verdict):
+        # type: (str) -> int
+        return 0 if verdict in ['T', 'D'] else 1 if verdict == 'A' else 2
+    keep_outputs()
+    kept = res
+    runs = [res]
+    for r in range(1, cfg.repeat):
+        for f in out_files:
+            removefile(f)
+        run = controlled_run_solution(solution, cfg.tl, cfg.ml, interactive, cfg.quiet, workdir, cfg.pin_cpu, stdin_fd)
+        runs.append(run)
+        if rank(run.verdict) > rank(kept.verdict):
+            keep_outputs()
+            kept = run
+    for f in out_files:
+        removefile(f)
+        if path.isfile(f + '.kept'):
+            os.rename(f + '.kept', f)
+    if len(set(run.verdict for run in runs)) > 1:
+        printq(cfg.quiet, colored_verdict('T', "nondeterministic verdicts of repeated runs: ") + colored_verdicts(''.join(run.verdict for run in runs)))
+    times = [run.time for run in runs]
+    stat_time = get_time_statistics(times)[cfg.repeat_stat]
+    verdict = kept.verdict
+    if cfg.tl is not None and stat_time > cfg.tl:
+        verdict = 'T'
+    # wait time is scaled to keep the typical wait/CPU ratio of the runs
+    wait_ratio = get_time_statistics([run.wait_time / max(run.time, 1e-3) for run in runs])['median']
+    return RunResult(verdict, kept.exit_code, stat_time, max(run.memory for run in runs), False, times, stat_time * wait_ratio)
+
 # run a given solution on a given test
 # solution: path to solution (executable or directory with java Task)
 # input_file: path to test's input file
@@ -883,43 +2072,114 @@ class Config:
 # if gen_output = True, then:
 #   test's output file is ignored
 #   it is overwritten with the output of solution (unless it was terminated prematurely)
+#   it is replaced atomically, so it is never left half-written (see stage_file)
 # if interactor is present, solution is run with it
-def check_solution_on_test(cfg, solution, input_file, gen_output = False):
-    # type: (Config, str, str, bool) -> RunResult
+# workdir is the directory where all intermediate files are put (see create_sandbox)
+# if cfg.cache is set, then result is taken from it when possible (except for gen_output = True case)
+# if cfg.repeat > 1, then solution is run several times (see run_solution_repeatedly)
+# if input_fd is set, then input file is not used: test is read by solution from this descriptor as stdin
+#   this is possible only if problem has no interactor, declares stdin as input, and checker does not need input (see can_test_in_memory)
+def check_solution_on_test(cfg, solution, input_file, gen_output = False, workdir = '.', input_fd = None):
+    # type: (Config, str, str, bool, str, Optional[int]) -> RunResult
+    return finish_solution_on_test(cfg, start_solution_on_test(cfg, solution, input_file, gen_output, workdir, input_fd))
+
+# returns whether solutions can be tested with input given only in memory (see input_fd in check_solution_on_test)
+# it requires that solution reads from stdin (see enable_stdin_redirection in config),
+# and that problem statement declares stdin explicitly (input.txt is assumed by default, see extract_filenames)
+def can_test_in_memory():
+    # type: () -> bool
+    checker_needs_input = if_exe_exists('check') and read_checker_tolerance() is None
+    if not enable_stdin_redirection:
+        return False    # solution reads input.txt then
+    header = extract_header(read_file_contents(find_problem_statement()))
+    declares_stdin = header is not None and not re.match(br'^(\w|\.)+$', header[1])
+    return declares_stdin and not if_exe_exists('interactor') and not checker_needs_input
+
+# state of check_solution_on_test between running solution and checking its output
+# res is result of running solution (verdict is final unless needs_checker is True)
+# cache_key is key of the result in cfg.cache (if it should be stored there)
+TestRun = NamedTuple('TestRun', [('solution', str), ('input_file', str), ('gen_output', bool), ('workdir', str),
+                                 ('res', RunResult), ('cache_key', Optional[str]), ('needs_checker', bool)])
+
+# first half of check_solution_on_test: runs solution, prepares output and answer for checker in workdir
+# returns TestRun, which must be passed to finish_solution_on_test
+def start_solution_on_test(cfg, solution, input_file, gen_output = False, workdir = '.', input_fd = None):
+    # type: (Config, str, str, bool, str, Optional[int]) -> TestRun
     assert(path.dirname(path.abspath(solution)) == path.abspath(os.getcwd()))
-    copyfile(input_file, 'input.txt')
-    removefile('output.txt')
-    removefile('answer.txt')
+    cache_key = None
+    if cfg.cache is not None and not gen_output:
+        cache_key = cfg.cache.get_run_key(cfg, solution, input_file)
+        cached_res = cfg.cache.lookup(cache_key)
+        if cached_res is not None:
+            printq(cfg.quiet, "on %s: %s (cached)" % (input_file, colored_verdict(cached_res.verdict)))
+            return TestRun(solution, input_file, gen_output, workdir, cached_res, None, False)
+    def wf(name):
+        # type: (str) -> str
+        return path.join(workdir, name)
+    if input_fd is None:
+        stage_file(input_file, wf('input.txt'))
+    else:
+        removefile(wf('input.txt'))
+    removefile(wf('output.txt'))
+    removefile(wf('answer.txt'))
     interactive = if_exe_exists('interactor')
-    if path.isfile(get_output_by_input(input_file)):
-        copyfile(get_output_by_input(input_file), 'answer.txt')
+    if interactive and path.isfile(get_output_by_input(input_file)):
+        stage_file(get_output_by_input(input_file), wf('answer.txt'))     # solution runs alongside, so not trusted
 
     (in_fn, out_fn) = read_filenames()
-    copyfile('input.txt', in_fn)
-    res = controlled_run_solution(solution, cfg.tl, cfg.ml, interactive, cfg.quiet)
-    if path.isfile(out_fn):
-        copyfile(out_fn, 'output.txt')
+    if input_fd is None:
+        stage_file(wf('input.txt'), wf(in_fn))
+    res = run_solution_repeatedly(cfg, solution, interactive, workdir, out_fn, input_fd)
+    if path.isfile(wf(out_fn)):
+        stage_file(wf(out_fn), wf('output.txt'), move = True)
 
     if enable_stdout_redirection:
-        if getfilesize('_stdout_') == 0:
-            os.remove('_stdout_')
-        if getfilesize('output.txt') <= 0 and getfilesize('_stdout_') > 0:
-            copyfile('_stdout_', 'output.txt')
-    if gen_output:
-        copyfile('output.txt', 'answer.txt')
-
+        if getfilesize(wf('_stdout_')) == 0:
+            os.remove(wf('_stdout_'))
+        if getfilesize(wf('output.txt')) <= 0 and getfilesize(wf('_stdout_')) > 0:
+            stage_file(wf('_stdout_'), wf('output.txt'), move = True)
+    if gen_output and path.isfile(wf('output.txt')):
+        stage_file(wf('output.txt'), wf('answer.txt'))
+
+    # answer.txt is left in problem directory after run, where user may edit it: then it must not be a link to jury's answer
+    trusted = workdir != '.'
     if not interactive:
         if not gen_output:
             if path.isfile(get_output_by_input(input_file)):
-                copyfile(get_output_by_input(input_file), 'answer.txt')
+                stage_file(get_output_by_input(input_file), wf('answer.txt'), trusted = trusted)
             elif res.verdict == 'A':
                 res = res._replace(verdict = 'O')
-        if res.verdict == 'A':
-            checker_res = run_checker(cfg.quiet)
-            res = res._replace(verdict = checker_res)
+    needs_checker = not interactive and res.verdict == 'A'
+    return TestRun(solution, input_file, gen_output, workdir, res, cache_key, needs_checker)
+
+# second half of check_solution_on_test: runs checker (unless its verdict is given), reports and remembers result
+# returns final RunResult
+def finish_solution_on_test(cfg, run, checker_verdict = None):
+    # type: (Config, TestRun, Optional[str]) -> RunResult
+    (solution, input_file, gen_output, workdir, res, cache_key, needs_checker) = run
+    if res.cached:
+        return res
+    def wf(name):
+        # type: (str) -> str
+        return path.join(workdir, name)
+    if needs_checker:
+        res = res._replace(verdict = checker_verdict or run_checker(cfg.quiet, workdir, cfg.checker_memo))
     printq(cfg.quiet, "on %s: %s" % (input_file, colored_verdict(res.verdict)))
+    if len(res.times) > 1:
+        printq(cfg.quiet, "time: min %(min)0.2f, median %(median)0.2f, max %(max)0.2f, std %(std)0.3f" % get_time_statistics(res.times)
+            + (colored_verdict('T', "  (borderline)") if is_time_borderline(res, cfg.tl) else ""))
+    if is_run_contended(res):
+        printq(cfg.quiet, colored_verdict('T', "time measured under CPU contention: waited for CPU %0.2f sec" % res.wait_time))
+    if res.verdict != 'A':
+        keep_failed_run(cfg, workdir, solution, input_file)
+    if cache_key is not None and cfg.cache is not None:
+        cfg.cache.store(cache_key, res)
+    if cfg.history is not None and not gen_output:
+        cfg.history.record(cfg, solution, input_file, res)
+    if cfg.test_stats is not None and not gen_output:
+        cfg.test_stats.update(solution, input_file, res)
     if gen_output and res.verdict in ['A', 'W', 'P', 'J']:
-        copyfile('answer.txt', get_output_by_input(input_file))
+        stage_file(wf('answer.txt'), get_output_by_input(input_file), trusted = workdir != '.', atomic = True)
     return res
 
 # run given solution on all tests (or on specified subset)
@@ -927,26 +2187,209 @@ def check_solution_on_test(cfg, solution, input_file, gen_output = False):
 # tests_filter: string specifying which tests to check (if None, then all tests are run)
 # returns list of RunResult tuples, one per test (see description above)
 # if cfg.stop=True, then shorter string is returned (up to first error inclusive)
+# if cfg.fail_fast=True too, then tests are run in order of get_tests_order (tests not run get '.' verdict)
+# if cfg.jobs > 1, then tests are run in parallel in sandbox directories (results are same as for sequential run)
+# if cfg.scratch is set, then tests are run in a sandbox there (instead of problem directory)
 # see check_solution_on_test for explanation of gen_output = True case
 def check_solution(cfg, solution, tests_filter = None, gen_output = False):
     # type: (Config, str, Optional[str], bool) -> List[RunResult]
-    res_list = []
-    for f in get_tests_inputs():
-        if not if_test_passes_filter(f, tests_filter):
-            res_list.append(RunResult('.', 0, 0, 0))
-            continue
-        res = check_solution_on_test(cfg, solution, f, gen_output)
-        res_list.append(res)
+    tests = get_tests_inputs()
+    if cfg.jobs > 1:
+        return check_solution_parallel(cfg, solution, tests, tests_filter, gen_output)
+    workdir = create_sandbox(cfg, 0, [solution]) if cfg.scratch is not None else '.'
+    pipeline = None     # type: Optional[CheckerPipeline]
+    if cfg.pipeline_checker and if_exe_exists('check') and not gen_output:
+        pipeline = CheckerPipeline(cfg, 1)
+    results = {}    # type: Dict[int, RunResult]
+
+    # saves result of i-th test, returns True if testing must be stopped
+    def record_result(i, res):
+        # type: (int, RunResult) -> bool
+        results[i] = res
         if res.verdict != 'A' and cfg.stop:
-            printq(cfg.quiet, "Stopped with %s on %s: %s" % (solution, f, colored_verdict(res.verdict)))
-            break
-    return res_list
+            printq(cfg.quiet, "Stopped with %s on %s: %s" % (solution, tests[i], colored_verdict(res.verdict)))
+            return True
+        return False
+
+    stopped = False
+    try:
+        last_checked_in_pipeline = False
+        for i in get_tests_order(cfg, solution, tests, tests_filter):
+            run = start_solution_on_test(cfg, solution, tests[i], gen_output, workdir)
+            # checker of the previous test was running while solution was running on this test
+            prev = pipeline.wait() if pipeline is not None else None
+            last_checked_in_pipeline = prev is not None
+            if prev is not None and record_result(*prev):
+                stopped = True
+                break
+            if pipeline is not None and run.needs_checker:
+                pipeline.submit(run, i)
+                continue
+            last_checked_in_pipeline = False
+            if record_result(i, finish_solution_on_test(cfg, run)):
+                stopped = True
+                break
+        prev = pipeline.wait() if pipeline is not None and not stopped else None
+        if prev is not None:
+            last_checked_in_pipeline = True
+            stopped = record_result(*prev)
+        if pipeline is not None and last_checked_in_pipeline and workdir == '.':
+            pipeline.take_back_files(workdir)   # files of the last checked test are expected in problem directory
+    finally:
+        if pipeline is not None:
+            pipeline.close()
+        if workdir != '.':
+            remove_sandbox(workdir)
+    return assemble_results_row(len(tests), results, stopped)
+
+# runs checker in background thread, while solution is being run on the next test (see Config.pipeline_checker)
+# data files of a submitted run are moved into a separate sandbox, so that checker uses its own copy of them
+# at most one run is checked at a time: previous one must be taken by wait before submitting next one
+class CheckerPipeline:
+    def __init__(self, cfg, index):
+        # type: (Config, int) -> None
+        self.cfg = cfg
+        self.sandbox = create_sandbox(cfg, index, [])
+        self.pending = None     # type: Optional[Tuple[int, TestRun]]
+        self.thread = None      # type: Optional[threading.Thread]
+        self.outcome = []       # type: List[Any]
+
+    # starts checker on given run of solution (which has needs_checker = True) with given index
+    def submit(self, run, index):
+        # type: (TestRun, int) -> None
+        assert(self.pending is None)
+        move_run_data_files(run.workdir, self.sandbox)
+        self.pending = (index, run._replace(workdir = self.sandbox))
+        self.outcome = []
+        def check():
+            # type: () -> None
+            try:
+                self.outcome.append(run_checker(self.cfg.quiet, self.sandbox, self.cfg.checker_memo))
+            except BaseException as e:
+                self.outcome.append(e)
+        self.thread = threading.Thread(target = check)
+        self.thread.daemon = True
+        self.thread.start()
+
+    # waits until checker finishes, and returns pair (index, final result) for the submitted run
+    # returns None if there is no submitted run
+    def wait(self):
+        # type: () -> Optional[Tuple[int, RunResult]]
+        if self.pending is None or self.thread is None:
+            return None
+        while self.thread.is_alive():
+            self.thread.join(0.1)   # with timeout to remain responsive to Ctrl+C
+        (index, run) = self.pending
+        self.pending = self.thread = None
+        if isinstance(self.outcome[0], BaseException):
+            raise self.outcome[0]
+        return (index, finish_solution_on_test(self.cfg, run, self.outcome[0]))
+
+    # moves data files of the last checked run from sandbox into given directory
+    def take_back_files(self, workdir):
+        # type: (str) -> None
+        move_run_data_files(self.sandbox, workdir)
+
+    # waits for checker (result is dropped) and deletes sandbox
+    def close(self):
+        # type: () -> None
+        if self.thread is not None:
+            self.thread.join()
+        self.pending = self.thread = None
+        remove_sandbox(self.sandbox)
+
+# returns indices of tests passing tests_filter, in order in which they should be run for given solution
+# normally it is the order of tests, but if cfg.stop and cfg.fail_fast are set, then order is taken from cfg.test_stats
+def get_tests_order(cfg, solution, tests, tests_filter = None):
+    # type: (Config, str, List[str], Optional[str]) -> List[int]
+    chosen = [i for i,f in enumerate(tests) if if_test_passes_filter(f, tests_filter)]
+    if cfg.stop and cfg.fail_fast and cfg.test_stats is not None:
+        chosen = cfg.test_stats.order_tests(solution, tests, chosen)
+    return chosen
+
+# returns list of results in order of tests, given results of the tests which were run (dict by test index)
+# tests which were not run get '.' verdict, and if solution was stopped on error, list ends at the last test run
+def assemble_results_row(tests_count, results, stopped):
+    # type: (int, Dict[int, RunResult], bool) -> List[RunResult]
+    count = max(results.keys()) + 1 if stopped else tests_count
+    return [results.get(i, RunResult('.', 0, 0, 0, False, [], 0.0)) for i in range(count)]
+
+# parallel version of check_solution for one solution (see check_solutions_parallel)
+def check_solution_parallel(cfg, solution, tests, tests_filter = None, gen_output = False):
+    # type: (Config, str, List[str], Optional[str], bool) -> List[RunResult]
+    return check_solutions_parallel(cfg, [solution], tests, tests_filter, gen_output)[0]
+
+# runs several solutions on tests in parallel, using cfg.jobs workers with separate sandboxes
+# every (solution, test) pair is a separate job, jobs are dispatched in order of solutions, then tests (see get_tests_order)
+# if cfg.schedule = 'lpt', then jobs are dispatched in order of decreasing estimated cost instead (see estimate_tests_costs)
+#   but if cfg.stop=True, then order of tests is kept, and only jobs at the same position are sorted by cost
+# if cfg.stop=True, then tests of a solution after its earliest failed test (in test order) are not started
+# on_row_done(k, results) is called as soon as all results of k-th solution are known
+# returns list with results of each solution (same as check_solution returns)
+def check_solutions_parallel(cfg, solutions, tests, tests_filter = None, gen_output = False, on_row_done = None):
+    # type: (Config, List[str], List[str], Optional[str], bool, Optional[Callable[[int, List[RunResult]], None]]) -> List[List[RunResult]]
+    orders = [get_tests_order(cfg, sol, tests, tests_filter) for sol in solutions]
+    jobs = [(k, pos) for k in range(len(solutions)) for pos in range(len(orders[k]))]
+    if cfg.schedule == 'lpt':
+        # longest processing time first: heavy jobs are not left for the end, when other workers are idle
+        # when stopping on error, tests likely to fail must still go first (see get_tests_order)
+        costs = estimate_tests_costs(cfg, tests)
+        jobs.sort(key = lambda job: (job[1] if cfg.stop else 0, -costs[orders[job[0]][job[1]]]))
+    lock = threading.Lock()
+    first_fail = [len(tests)] * len(solutions)
+    results = [{} for sol in solutions]     # type: List[Dict[int, RunResult]]
+    rows = [None] * len(solutions)          # type: List[Optional[List[RunResult]]]
+
+    # assembles row of results for k-th solution if all of them are known
+    def try_finish_row(k):
+        # type: (int) -> None
+        if rows[k] is not None:
+            return
+        known = {}      # type: Dict[int, RunResult]
+        stopped = False
+        for i in orders[k]:
+            if i not in results[k]:
+                return
+            res = known[i] = results[k][i]
+            if res.verdict != 'A' and cfg.stop:
+                printq(cfg.quiet, "Stopped with %s on %s: %s" % (solutions[k], tests[i], colored_verdict(res.verdict)))
+                stopped = True
+                break
+        res_list = assemble_results_row(len(tests), known, stopped)
+        rows[k] = res_list
+        if on_row_done is not None:
+            on_row_done(k, res_list)
+
+    sandboxes = [create_sandbox(cfg, w, solutions) for w in range(min(cfg.jobs, len(jobs)))]
+    def work(worker, job):
+        # type: (int, Tuple[int, int]) -> None
+        (k, pos) = job
+        if cfg.stop and pos > first_fail[k]:
+            return
+        idx = orders[k][pos]
+        res = check_solution_on_test(cfg, solutions[k], tests[idx], gen_output, sandboxes[worker])
+        with lock:
+            results[k][idx] = res
+            if res.verdict != 'A':
+                first_fail[k] = min(first_fail[k], pos)
+            try_finish_row(k)
+    try:
+        run_parallel_jobs(cfg.jobs, jobs, work)
+    finally:
+        for sandbox in sandboxes:
+            remove_sandbox(sandbox)
+    for k in range(len(solutions)):
+        try_finish_row(k)       # e.g. if no tests were chosen
+    return [row or [] for row in rows]
 
 # returns formatted version of solution results
 # run_results must be an array of RunResult tuples
 # it represents single row in table of results (returned as list of colored strings)
-def format_solution_result(solution_name, run_results):
-    # type: (str, List[RunResult]) -> List[str]
+# if solution was run several times on tests, then additional column is added with:
+#   time statistics on the slowest test (min/median/max and standard deviation)
+#   list of borderline tests, with median time close to tl (if specified)
+def format_solution_result(solution_name, run_results, tl = None):
+    # type: (str, List[RunResult], Optional[float]) -> List[str]
     total_verdict = 'A'
     test_index = len(run_results) - 1
     for i,res in enumerate(run_results):
@@ -959,16 +2402,31 @@ def format_solution_result(solution_name, run_results):
     full_verdict_name = get_verdict_full_name(total_verdict)
     max_time = max(res.time for res in run_results)
     max_mem = max(res.memory for res in run_results)
-    return [
+    cached_count = sum(1 for res in run_results if res.cached)
+    cached_str = " (%d cached)" % cached_count if cached_count > 0 else ""
+    contended_count = len([res for res in run_results if is_run_contended(res)])
+    if contended_count > 0:
+        cached_str += colored_verdict('T', " (%d contended)" % contended_count)
+    row = [
         color_highlight(solution_name),
         colored_verdict(full_verdict_name),
         "%d" % (test_index + 1),
-        colored_verdicts(verdicts_string),
+        colored_verdicts(verdicts_string) + cached_str,
         color_highlight("%0.2f" % max_time) + " s",
         color_highlight("%0.1f" % max_mem) + " mb"
     ]
+    if any(len(res.times) > 1 for res in run_results):
+        slowest = max(range(len(run_results)), key = lambda i: run_results[i].time)
+        stats = get_time_statistics(run_results[slowest].times)
+        stats_str = "#%d: %0.2f/%0.2f/%0.2f s, std %0.3f" % (slowest + 1, stats['min'], stats['median'], stats['max'], stats['std'])
+        borderline = [str(i + 1) for i,res in enumerate(run_results) if is_time_borderline(res, tl)]
+        if len(borderline) > 0:
+            stats_str += colored_verdict('T', "  borderline: " + ','.join(borderline))
+        row.append(stats_str)
+    return row
 
 # run given solutions on given tests
+# if cfg.jobs > 1, then all (solution, test) pairs are run in parallel, and each row is printed as soon as it is ready
 # solutions: list of solutions to check (if None, all solutions are found)
 # tests: filter of tests to check (if None, then all tests are used)
 # returns list of pairs:
@@ -979,19 +2437,29 @@ def check_many_solutions(cfg, solutions = None, tests = None):
     if solutions is None:
         solutions = get_solutions()
         printq(cfg.quiet, "Solutions: %s" % str(solutions))
+    def print_row(sol, res):
+        # type: (str, List[RunResult]) -> None
+        if not cfg.quiet:
+            row = format_solution_result(sol, res, cfg.tl)
+            print("%s:   %s (%s)        %s\n" % (row[0], row[1], row[2], ' '.join([row[3]] + row[6:])))
+    if cfg.jobs > 1:
+        sols = solutions
+        res_lists = check_solutions_parallel(cfg, sols, get_tests_inputs(), tests, False, lambda k, res: print_row(sols[k], res))
+        return list(zip(solutions, res_lists))
     res_table = []
     for sol in solutions:
         res = check_solution(cfg, sol, tests)
         res_table.append((sol, res))
-        if not cfg.quiet:
-            row = format_solution_result(sol, res)
-            print("%s:   %s (%s)        %s\n" % (row[0], row[1], row[2], row[3]))
+        print_row(sol, res)
     return res_table
 
 # pretty-print the results returned by check_all_solutions
-def print_solutions_results(data):
-    # type: (List[Tuple[str, List[RunResult]]]) -> None
-    text_table = [format_solution_result(*elem) for elem in data]
+# tl is time limit used to detect borderline tests (see format_solution_result)
+def print_solutions_results(data, tl = None):
+    # type: (List[Tuple[str, List[RunResult]]], Optional[float]) -> None
+    text_table = [format_solution_result(sol, res, tl) for sol,res in data]
+    columns = max([len(row) for row in text_table] + [0])
+    text_table = [row + [''] * (columns - len(row)) for row in text_table]
     print(draw_table_colored(text_table))
 
 # returns EOLN character for system's default or for specified style
@@ -1011,6 +2479,31 @@ def convert_eoln(contents, style = ""):
     wanted_eol = get_eoln_char(style)
     return contents.replace(b'\r\n', b'\n').replace(b'\r', b'\n').replace(b'\n', wanted_eol)
 
+# incremental version of convert_eoln: converts EOLN style of data given chunk by chunk
+# call convert for each chunk in order, and then finish: concatenation of their results is same as convert_eoln of all data
+class EolnConverter:
+    def __init__(self, style = ""):
+        # type: (str) -> None
+        self.style = style
+        self.pending = b''      # trailing CR of previous chunk (it may be the first half of CRLF)
+
+    # returns converted data for the next chunk (some of its data may be delayed till next call)
+    def convert(self, chunk):
+        # type: (bytes) -> bytes
+        data = self.pending + chunk
+        self.pending = b''
+        if data.endswith(b'\r'):
+            self.pending = b'\r'
+            data = data[:-1]
+        return convert_eoln(data, self.style)
+
+    # returns converted data remaining after the last chunk
+    def finish(self):
+        # type: () -> bytes
+        data = convert_eoln(self.pending, self.style)
+        self.pending = b''
+        return data
+
 # run validator on given test (i.e. input_file)
 # returns True on success, False on validation error, None if something is missing
 def validate_test(input_file, quiet = False):
@@ -1018,35 +2511,57 @@ def validate_test(input_file, quiet = False):
     if not if_exe_exists('validator') or not path.isfile(input_file):
         return None
     printq(quiet, './validator < ' + input_file)
-    with open(input_file, 'rb') as f:   # type: IO[Any]
-        if get_eoln_char(contest_eoln_style) != get_eoln_char():
-            data = f.read()
-            data = convert_eoln(data)
-            f = tempfile.TemporaryFile()
-            f.write(data)
-            f.seek(0)
-        err = cmd_runner(quiet)('./validator', input = f).returncode
-    return err == 0
+    with open(input_file, 'rb') as f:
+        return run_validator(f, quiet)
+
+# same as validate_test, but test is given as contents in memory (they are fed to validator through pipe)
+def validate_test_data(data, quiet = False):
+    # type: (bytes, bool) -> Optional[bool]
+    if not if_exe_exists('validator'):
+        return None
+    return run_validator(data, quiet)
+
+# runs validator with test data given as open file or as contents in memory, returns True if validator accepts it
+# file is passed to validator as stdin directly if EOLNs need no conversion,
+# otherwise data is streamed into stdin pipe of validator, with EOLNs converted to system's style on-the-fly
+# (to avoid testlib validator issue with EOLNs, see README)
+def run_validator(source, quiet = False):
+    # type: (Union[IO[bytes], bytes], bool) -> bool
+    exe = 'validator' if os.name == 'nt' else './validator'
+    converter = EolnConverter() if get_eoln_char(contest_eoln_style) != get_eoln_char() else None
+    with open(os.devnull, 'wb') if quiet else null_context(None) as sink:
+        if converter is None and not isinstance(source, bytes):
+            return subprocess.call([exe], stdin = source, stdout = sink, stderr = sink) == 0
+        chunks = [source] if isinstance(source, bytes) else iter(lambda: source.read(2**20), b'')   # type: Iterable[bytes]
+        proc = subprocess.Popen([exe], stdin = subprocess.PIPE, stdout = sink, stderr = sink, bufsize = 0)
+        stdin = proc.stdin
+        assert(stdin is not None)
+        try:
+            for chunk in chunks:
+                stdin.write(converter.convert(chunk) if converter is not None else chunk)
+            if converter is not None:
+                stdin.write(converter.finish())
+            stdin.close()
+        except (IOError, OSError):      # validator has exited without reading whole input
+            pass
+        return proc.wait() == 0
 
 # run validator on given set of tests
 # returns a list of relative paths to all the failed test input files
 # if validator is missing, some string is returned
-def validate_many_tests(tests, quiet = False):
-    # type: (List[str], bool) -> Union[List[str], str]
-    incorrect = []
-    for f in tests:
-        ok = validate_test(f, quiet)
-        if ok is None:
-            return "not found"
-        if not ok:
-            incorrect.append(f)
-    return incorrect
+# if jobs > 1, then several tests are validated in parallel
+def validate_many_tests(tests, quiet = False, jobs = 1):
+    # type: (List[str], bool, int) -> Union[List[str], str]
+    results = run_parallel_jobs(max(jobs, 1), tests, lambda worker, f: validate_test(f, quiet))
+    if None in results:
+        return "not found"
+    return [f for f,ok in zip(tests, results) if not ok]
 
 # run validator on all tests
 # see validate_many_tests for more info
-def validate_all_tests(quiet = False):
-    # type: (bool) -> Union[List[str], str]
-    return validate_many_tests(get_tests_inputs(), quiet)
+def validate_all_tests(quiet = False, jobs = 1):
+    # type: (bool, int) -> Union[List[str], str]
+    return validate_many_tests(get_tests_inputs(), quiet, jobs)
 
 # pretty-print the results returned by validate_all_tests
 def print_validate_results(results):
@@ -1170,43 +2685,327 @@ def print_check_output_files(results):
     else:
         print(colored_verdict('W', "Missing output files: ") + str(results))
 
+# returns copy of config for running solutions on generated tests (see stress_test_solutions)
+# intermediate messages are suppressed, results are not cached and not recorded into history
+def get_stress_config(cfg):
+    # type: (Config) -> Config
+    cfg = copy.copy(cfg)
+    cfg.quiet = True
+    cfg.cache = None        # random tests would only pollute it
+    cfg.history = None
+    cfg.test_stats = None
+    return cfg
+
+# creates working directories for jobs workers running solutions on generated tests (see stress_test_solutions)
+# these are sandboxes if there are several workers or cfg.scratch is set, otherwise it is just problem directory
+def create_stress_workdirs(cfg, jobs, solutions):
+    # type: (Config, int, List[str]) -> List[str]
+    if jobs > 1 or cfg.scratch is not None:
+        return [create_sandbox(cfg, w, solutions) for w in range(jobs)]
+    return ['.']
+
+# removes working directories created by create_stress_workdirs
+def remove_stress_workdirs(workdirs):
+    # type: (List[str]) -> None
+    for workdir in workdirs:
+        if workdir != '.':
+            remove_sandbox(workdir)
+
+# returns path to the file where test is saved when running solutions in given working directory
+def get_stress_test_name(workdir):
+    # type: (str) -> str
+    return path.join(workdir, 'stress_test.in') if workdir != '.' else 'stress_test.in'
+
+# result of shrinking a problematic test of stress testing (see shrink_stress_test)
+# command - generator command line with lowered arguments, test - contents of the smallest problematic test found
+# generated - whether test is exactly the output of command (False if lines or tokens were removed from it)
+ShrunkTest = NamedTuple('ShrunkTest', [('command', List[str]), ('test', bytes), ('generated', bool)])
+
 # run stress-testing of given solutions on given generator
 # returns an infinite iterable sequence of problematic seeds (i.e. works as a generator of bad tests)
+# each element is a pair: problematic seed, and result of its shrinking (None if shrinking is disabled)
 # generator_args - generator and list of its parameters (i.e. Popen args)
 # solutions - list of solutions (usually at least 2, but may be 1) to be stress-tested
 # for each test, one int32 argument is added to generator's args as the last one (seed)
+# seeds go sequentially starting from first_seed (chosen randomly if None)
 # first solution is used to generate answer for a test, others are compared to it
 # validator is used if available (and not used otherwise)
-def stress_test_solutions(cfg, generator_args, solutions):
-    # type: (Config, Union[List[str], str], List[str]) -> Iterator[int]
+# if cfg.scratch is set, tests are run in a sandbox there, and only problematic test is copied to problem directory
+# if cfg.jobs > 1, then cfg.jobs workers test in parallel, each in its own sandbox: k-th worker takes every k-th seed
+# every yielded seed is the smallest problematic one after the previous yielded seed, so results are reproducible
+# if cfg.shrink_budget is set, then problematic test is shrinked before yielding its seed (see shrink_stress_test)
+def stress_test_solutions(cfg, generator_args, solutions, first_seed = None):
+    # type: (Config, Union[List[str], str], List[str], Optional[int]) -> Iterator[Tuple[int, Optional[ShrunkTest]]]
     if not isinstance(generator_args, list):
         generator_args = [generator_args]
-    test_name = 'stress_test.in'
+    jobs = max(cfg.jobs, 1)
+    workdirs = create_stress_workdirs(cfg, jobs, solutions)
     do_validate = if_exe_exists('validator')
     quiet = cfg.quiet
-    cfg = copy.copy(cfg)
-    cfg.quiet = True
+    shrink_cfg = cfg
+    cfg = get_stress_config(cfg)
     printq(quiet, "Validator enabled" if do_validate else "No validator found")
-    while True:
-        gen_seed = random.randint(1, 1000000000) - 1
-        seeded_args = generator_args + [str(gen_seed)]
-        printq(quiet, "Generating test: " + str(seeded_args))
-        test = subprocess.check_output(seeded_args)
-        with open(test_name, 'wb') as f:
-            f.write(test)
-        removefile(get_output_by_input(test_name))
-        if do_validate and not validate_test(test_name, True):
-            printq(quiet, colored_verdict('R', "Invalid input on seed ") + str(gen_seed))
-            yield gen_seed
-            continue
-        verdicts = []
-        for k,sol in enumerate(solutions):
-            res = check_solution_on_test(cfg, sol, test_name, k==0)
-            verdicts.append(res.verdict)
-        if verdicts.count('A') == len(verdicts):
-            continue
-        printq(quiet, colored_verdict('W', "Incompatible outputs: ") + colored_verdicts(verdicts) + " on seed " + str(gen_seed))
-        yield gen_seed
+    next_seed = first_seed if first_seed is not None else random.randint(0, 999999999)
+    printq(quiet, "Stress testing from seed %d with %d worker(s)" % (next_seed, jobs))
+
+    lock = threading.Lock()
+    best_seed = [0]     # smallest problematic seed found so far (only seeds less than it are tested)
+
+    # checks all seeds assigned to given worker, until they reach best_seed
+    def work(worker, start_seed):
+        # type: (int, int) -> None
+        workdir = workdirs[worker]
+        test_name = get_stress_test_name(workdir)
+        gen_seed = start_seed + worker
+        try:
+            while gen_seed < best_seed[0]:
+                printq(quiet, "Generating test: " + str(generator_args + [str(gen_seed)]))
+                problem = run_stress_iteration(cfg, generator_args, gen_seed, solutions, test_name, workdir, do_validate)
+                if problem is not None:
+                    with lock:
+                        if gen_seed < best_seed[0]:
+                            best_seed[0] = gen_seed
+                            printq(quiet, problem + " on seed " + str(gen_seed))
+                            keep_bad_test(test_name)
+                    return
+                gen_seed += jobs
+        except BaseException:
+            best_seed[0] = -1   # stop other workers
+            raise
+
+    try:
+        while True:
+            best_seed[0] = 2**63
+            run_parallel_jobs(jobs, [next_seed] * jobs, work)
+            shrunk = None   # type: Optional[ShrunkTest]
+            if shrink_cfg.shrink_budget is not None:
+                shrunk = shrink_stress_test(shrink_cfg, generator_args, best_seed[0], solutions, shrink_cfg.shrink_budget, workdirs)
+            yield (best_seed[0], shrunk)
+            next_seed = best_seed[0] + 1
+    finally:
+        remove_stress_workdirs(workdirs)
+
+# copies problematic test of stress testing from sandbox into problem directory for inspection
+def keep_bad_test(test_name):
+    # type: (str) -> None
+    if test_name != 'stress_test.in':
+        copyfile(test_name, 'stress_test.in')
+        removefile('stress_test.out')
+        if path.isfile(get_output_by_input(test_name)):
+            copyfile(get_output_by_input(test_name), 'stress_test.out')
+
+# runs one iteration of stress testing (see stress_test_solutions): generates test with given seed and checks solutions on it
+# test is saved into test_name, solutions are run in workdir
+# if cfg.stress_in_memory is set and it is possible (see can_test_in_memory), then test is kept in memory:
+#   it is passed to validator and solutions through stdin, and saved into test_name only if it is problematic
+# returns None if everything is fine, otherwise colored description of the problem
+def run_stress_iteration(cfg, generator_args, gen_seed, solutions, test_name, workdir, do_validate):
+    # type: (Config, List[str], int, List[str], str, str, bool) -> Optional[str]
+    def is_bad(results):
+        # type: (Optional[List[RunResult]]) -> bool
+        return results is None or any(res.verdict != 'A' for res in results)
+    test = subprocess.check_output(generator_args + [str(gen_seed)])
+    results = run_test_data(cfg, test, solutions, test_name, workdir, do_validate, is_bad)
+    if results is None:
+        return colored_verdict('R', "Invalid input")
+    if not is_bad(results):
+        return None
+    return colored_verdict('W', "Incompatible outputs: ") + colored_verdicts(''.join(res.verdict for res in results))
+
+# runs all solutions on test with given contents (first one generates answer)
+# test is saved into test_name, solutions are run in workdir
+# if cfg.stress_in_memory is set and it is possible (see can_test_in_memory), then test is kept in memory,
+#   and is saved into test_name only if save_test(results) returns True
+# returns list of results of solutions, or None if validation was requested and the test is invalid
+def run_test_data(cfg, test, solutions, test_name, workdir, do_validate, save_test):
+    # type: (Config, bytes, List[str], str, str, bool, Callable[[Optional[List[RunResult]]], bool]) -> Optional[List[RunResult]]
+    removefile(get_output_by_input(test_name))
+    with memory_file(test) if cfg.stress_in_memory and can_test_in_memory() else null_context(None) as input_fd:
+        if input_fd is None:
+            write_file_contents(test_name, test)
+        results = None     # type: Optional[List[RunResult]]
+        if not do_validate or (validate_test(test_name, True) if input_fd is None else validate_test_data(test, True)):
+            results = [check_solution_on_test(cfg, sol, test_name, k==0, workdir, input_fd) for k,sol in enumerate(solutions)]
+        if input_fd is not None and save_test(results):
+            write_file_contents(test_name, test)
+    return results
+
+# entry of leaderboard of slow tests (see hunt_slow_tests)
+# time and memory are maximal over all solutions, verdicts are per solution, args are generator command line (seed is the last one)
+SlowTest = NamedTuple('SlowTest', [('time', float), ('memory', float), ('verdicts', str), ('args', List[str])])
+
+# returns generator command line for one iteration of slow tests hunting (see hunt_slow_tests)
+# integer arguments in base_args (except the generator itself) are treated as upper bounds, and are changed according to vary:
+#   'none'   - all arguments are kept intact
+#   'random' - each integer argument is chosen uniformly at random between 1 and its upper bound
+#   'climb'  - one integer argument of the slowest test found so far is randomly moved up or down (hill climbing)
+# all random choices are determined by seed, which is appended as the last argument
+def get_hunt_generator_args(base_args, seed, vary = 'none', slowest = None):
+    # type: (List[str], int, str, Optional[SlowTest]) -> List[str]
+    numeric = [i for i in range(1, len(base_args)) if re.match(r'^\d+$', base_args[i])]
+    args = list(base_args)
+    if vary != 'none' and len(numeric) > 0:
+        rnd = random.Random(seed)
+        if vary == 'climb':
+            if slowest is not None:
+                args = list(slowest.args[:-1])
+            numeric = [rnd.choice(numeric)]
+        for i in numeric:
+            bound = int(base_args[i])
+            if vary == 'climb':
+                step = max(int(args[i]) // 2, 1)
+                value = int(args[i]) + rnd.randint(-step, step)
+            else:
+                value = rnd.randint(1, bound)
+            args[i] = str(max(min(value, bound), min(bound, 1)))
+    return args + [str(seed)]
+
+# runs solutions on many tests produced by given generator, looking for the tests where solutions are slowest
+# generator_args - generator and list of its parameters (see also get_hunt_generator_args for vary)
+# iterations - how many tests to try, seeds go sequentially starting from first_seed (chosen randomly if None)
+# returns leaderboard: top_count slowest tests (as SlowTest tuples), sorted by time in decreasing order
+# note that time of a solution is capped by cfg.tl (set it to None to see real time)
+# tests are run the same way as with stress_test_solutions, including parallel workers if cfg.jobs > 1
+#   (with vary = 'climb' results depend on the order of completion, so they are reproducible only with one worker)
+def hunt_slow_tests(cfg, generator_args, solutions, iterations, top_count = 10, first_seed = None, vary = 'none'):
+    # type: (Config, Union[List[str], str], List[str], int, int, Optional[int], str) -> List[SlowTest]
+    if not isinstance(generator_args, list):
+        generator_args = [generator_args]
+    jobs = max(min(cfg.jobs, iterations), 1)
+    workdirs = create_stress_workdirs(cfg, jobs, solutions)
+    do_validate = if_exe_exists('validator')
+    quiet = cfg.quiet
+    cfg = get_stress_config(cfg)
+    first_seed = first_seed if first_seed is not None else random.randint(0, 999999999)
+    printq(quiet, "Hunting slow tests on seeds from %d to %d with %d worker(s)" % (first_seed, first_seed + iterations - 1, jobs))
+
+    lock = threading.Lock()
+    leaderboard = []    # type: List[SlowTest]
+
+    def work(worker, seed):
+        # type: (int, int) -> None
+        workdir = workdirs[worker]
+        test_name = get_stress_test_name(workdir)
+        with lock:
+            command = get_hunt_generator_args(generator_args, seed, vary, leaderboard[0] if leaderboard else None)
+        test = subprocess.check_output(command)
+        results = run_test_data(cfg, test, solutions, test_name, workdir, do_validate, lambda results: False)
+        if results is None:
+            printq(quiet, colored_verdict('R', "Invalid input") + " for " + ' '.join(command))
+            return
+        entry = SlowTest(max(res.time for res in results), max(res.memory for res in results), ''.join(res.verdict for res in results), command)
+        with lock:
+            printq(quiet, "%s: %0.2f s, %0.1f mb, %s" % (' '.join(command), entry.time, entry.memory, colored_verdicts(entry.verdicts)))
+            leaderboard.append(entry)
+            leaderboard.sort(key = lambda e: (-e.time, -e.memory))
+            del leaderboard[top_count:]
+
+    try:
+        run_parallel_jobs(jobs, list(range(first_seed, first_seed + iterations)), work)
+    finally:
+        remove_stress_workdirs(workdirs)
+    return leaderboard
+
+# pretty-print results of hunt_slow_tests call
+# generator command lines are also printed as lines of simple generation script (see parse_generation_script),
+# so that they can be pasted into gen.cmd: they produce new tests numbered after the existing ones
+def print_slow_tests(leaderboard):
+    # type: (List[SlowTest]) -> None
+    indices = [get_test_index(f) for f in get_tests_inputs() if re.match(r'^\d+$', path.splitext(path.basename(f))[0])]
+    first_index = max(indices + [0]) + 1
+    lines = []
+    print("Slowest tests found:")
+    for k,entry in enumerate(leaderboard):
+        generator = path.splitext(path.basename(entry.args[0]))[0]
+        lines.append('%s >%s' % (' '.join([generator] + entry.args[1:]), get_test_input(first_index + k)))
+        print("%s s  %s mb  %s  %s" % (color_highlight("%6.2f" % entry.time), color_highlight("%7.1f" % entry.memory),
+            colored_verdicts(entry.verdicts), ' '.join([generator] + entry.args[1:])))
+    if len(lines) > 0:
+        print("Lines for gen.cmd:")
+        print('\n'.join(lines))
+
+# searches for a smaller problematic test of stress testing, produced by given generator with given seed
+# problematic test is a valid one (if validator is present) where not all solutions get 'A' (see stress_test_solutions)
+# first integer arguments of generator (see get_hunt_generator_args) are lowered while test remains problematic,
+#   then lines and tokens of the test are removed one chunk at a time (delta debugging, see shrink_test_units)
+# candidate tests are checked in parallel by cfg.jobs workers, in given workdirs (created if None)
+# search stops after budget seconds, and the smallest problematic test found is saved as stress_test.in (with stress_test.out)
+# returns ShrunkTest: generator command line (with lowered arguments) and contents of the smallest problematic test
+# note: if lines or tokens were removed, then the test is no longer produced by the returned generator command
+def shrink_stress_test(cfg, generator_args, seed, solutions, budget, workdirs = None):
+    # type: (Config, List[str], int, List[str], float, Optional[List[str]]) -> ShrunkTest
+    deadline = time.time() + budget
+    own_workdirs = workdirs is None
+    if workdirs is None:
+        workdirs = create_stress_workdirs(cfg, max(cfg.jobs, 1), solutions)
+    do_validate = if_exe_exists('validator')
+    quiet = cfg.quiet
+    cfg = get_stress_config(cfg)
+    workers = workdirs     # type: List[str]
+    evaluated = [0]
+
+    # checks all candidate tests (given as contents or generator command lines), returns index of the first problematic one
+    def find_first_problematic(candidates):
+        # type: (List[Union[bytes, List[str]]]) -> Optional[int]
+        def work(worker, candidate):
+            # type: (int, Union[bytes, List[str]]) -> bool
+            if time.time() > deadline:
+                return False
+            test = candidate if isinstance(candidate, bytes) else subprocess.check_output(candidate)
+            results = run_test_data(cfg, test, solutions, get_stress_test_name(workers[worker]), workers[worker], do_validate, lambda results: False)
+            evaluated[0] += 1
+            return results is not None and any(res.verdict != 'A' for res in results)
+        verdicts = run_parallel_jobs(len(workers), candidates, work)
+        return next((i for i,bad in enumerate(verdicts) if bad), None)
+
+    try:
+        command = generator_args + [str(seed)]
+        original_size = len(subprocess.check_output(command))
+        numeric = [i for i in range(1, len(generator_args)) if re.match(r'^\d+$', generator_args[i])]
+        while time.time() < deadline:
+            candidates = []     # type: List[Union[bytes, List[str]]]
+            for i in numeric:
+                value = int(command[i])
+                for lowered in sorted(set([value // 2, value * 3 // 4, value - 1])):
+                    if 0 <= lowered < value:
+                        candidates.append(command[:i] + [str(lowered)] + command[i+1:])
+            idx = find_first_problematic(candidates)
+            if idx is None:
+                break
+            command = cast(List[str], candidates[idx])
+        printq(quiet, "Shrinking with generator: " + ' '.join(command))
+
+        generated = subprocess.check_output(command)
+        test = shrink_test_units(generated.splitlines(True), find_first_problematic, deadline)
+        test = shrink_test_units(re.findall(br'\s*\S+|\s+$', test), find_first_problematic, deadline)
+
+        test_name = get_stress_test_name(workers[0])
+        run_test_data(cfg, test, solutions, test_name, workers[0], do_validate, lambda results: True)
+        keep_bad_test(test_name)
+        printq(quiet, colored_verdict('A', "Shrinked problematic test from %d to %d bytes (%d candidates checked)" % (original_size, len(test), evaluated[0])))
+        return ShrunkTest(command, test, test == generated)
+    finally:
+        if own_workdirs:
+            remove_stress_workdirs(workdirs)
+
+# shrinks problematic test consisting of given units (e.g. lines) by removing chunks of them (delta debugging)
+# find_first_problematic takes list of candidate tests, returns index of the first problematic one or None
+# search stops at given deadline (in terms of time.time()), returns contents of the smallest problematic test found
+def shrink_test_units(units, find_first_problematic, deadline):
+    # type: (List[bytes], Callable[[List[Union[bytes, List[str]]]], Optional[int]], float) -> bytes
+    chunks = 2
+    while len(units) >= 2 and time.time() < deadline:
+        size = (len(units) + chunks - 1) // chunks
+        candidates = [units[:k] + units[k+size:] for k in range(0, len(units), size)]
+        idx = find_first_problematic([b''.join(c) for c in candidates])
+        if idx is not None:
+            units = candidates[idx]
+            chunks = max(chunks - 1, 2)
+        elif chunks >= len(units):
+            break
+        else:
+            chunks = min(chunks * 2, len(units))
+    return b''.join(units)
 
 # compiles given source file (in its directory)
 # language is guessed from extension
@@ -1326,23 +3125,115 @@ def print_parse_generation_script(results):
         if results[1]:
             print(colored_verdict('T', 'Warnings:\n' + '\n'.join(results[1])))
 
+# persistent manifest of generated tests (stored in state directory of the problem), used to skip lines of generation script
+# for each test index, it stores how input was generated: generator program hash, arguments, EOL style and input hash
+# it also stores how output was generated: solution hash, input hash and output hash
+class GenerationManifest:
+    def __init__(self, filename = None):
+        # type: (Optional[str]) -> None
+        self.filename = filename or path.join(get_state_directory(), 'generation.json')
+        self.lock = threading.Lock()
+        self.entries = {}   # type: Dict[str, Dict[str, Any]]
+        data = read_file_contents(self.filename)
+        if data is not None:
+            try:
+                self.entries = json.loads(data.decode('utf-8'))
+            except ValueError:
+                self.entries = {}   # corrupted manifest is simply dropped
+
+    # returns description of how given line of generation script produces input file
+    def get_input_record(self, line):
+        # type: (GenScriptLine) -> Dict[str, Any]
+        return {'generator': hash_program(line.generator), 'args': line.args, 'eoln': contest_eoln_style}
+
+    # returns whether input file of given line of generation script is up to date (i.e. line need not be executed)
+    def is_input_up_to_date(self, line):
+        # type: (GenScriptLine) -> bool
+        with self.lock:
+            stored = self.entries.get(str(line.test), {}).get('input')     # type: Optional[Dict[str, Any]]
+        record = self.get_input_record(line)
+        record['hash'] = hash_file(get_test_input(line.test))
+        return stored == record
+
+    # saves the fact that input file was generated by given line of generation script
+    def record_input(self, line):
+        # type: (GenScriptLine) -> None
+        record = self.get_input_record(line)
+        record['hash'] = hash_file(get_test_input(line.test))
+        with self.lock:
+            self.entries.setdefault(str(line.test), {})['input'] = record
+
+    # returns description of how output file of given test is generated by given solution
+    def get_output_record(self, test, solution):
+        # type: (int, str) -> List[Optional[str]]
+        input_file = get_test_input(test)
+        return [hash_program(solution), hash_file(input_file), hash_file(get_output_by_input(input_file))]
+
+    # returns whether output file of given test is up to date, i.e. it was generated by given solution for current input
+    def is_output_up_to_date(self, test, solution):
+        # type: (int, str) -> bool
+        with self.lock:
+            entry = self.entries.get(str(test), {})
+        return entry.get('output') is not None and entry['output'] == self.get_output_record(test, solution)
+
+    # saves the fact that output file of given test was generated by given solution
+    def record_output(self, test, solution):
+        # type: (int, str) -> None
+        record = self.get_output_record(test, solution)
+        with self.lock:
+            self.entries.setdefault(str(test), {})['output'] = record
+
+    # forgets how output file of given test was generated (e.g. if generating it has failed)
+    def forget_output(self, test):
+        # type: (int) -> None
+        with self.lock:
+            self.entries.get(str(test), {}).pop('output', None)
+
+    # removes all the entries
+    def clear(self):
+        # type: () -> None
+        with self.lock:
+            self.entries = {}
+
+    # writes manifest to disk
+    def save(self):
+        # type: () -> None
+        with self.lock:
+            if not path.isdir(path.dirname(self.filename)):
+                os.makedirs(path.dirname(self.filename))
+            write_file_contents(self.filename, json.dumps(self.entries, sort_keys = True, indent = 1).encode('utf-8'))
+
 # executes one line of simple generation script (aka "gen_random 10 50 >tests/17.in")
+# stdout of generator is streamed into the test file (with EOLN conversion), so memory usage does not depend on test size
+# old and new contents of the test are compared by hashes
 def execute_generation_line(cfg, line):
     # type: (Config, GenScriptLine) -> bool
     exe = line.generator if os.name == 'nt' else path.join('./', line.generator)
     testfn = get_test_input(line.test)
-    old_data = read_file_contents(testfn)
+    old_hash = hash_file(testfn, False)
     cmd = '%s %s >%s' % (exe, ' '.join(line.args), testfn)
     printq(cfg.quiet, "Cmd: %s" % colored_verdict('R', cmd))
-    err = (sarge.capture_stderr if cfg.quiet else sarge.run)(cmd).returncode
-    if err != 0:
-        printq(cfg.quiet, colored_verdict('W', 'Failed to execute generator line'))
+    converter = EolnConverter(contest_eoln_style) if get_eoln_char(contest_eoln_style) != get_eoln_char() else None
+    new_hash = hashlib.sha1()
+    with open(os.devnull, 'wb') if cfg.quiet else null_context(None) as stderr, open(testfn, 'wb') as f:
+        proc = subprocess.Popen([exe] + line.args, stdout = subprocess.PIPE, stderr = stderr)
+        stdout = proc.stdout
+        assert(stdout is not None)
+        def put(data):
+            # type: (bytes) -> None
+            f.write(data)
+            new_hash.update(data)
+        for chunk in iter(lambda: stdout.read(2**20), b''):
+            put(converter.convert(chunk) if converter is not None else chunk)
+        if converter is not None:
+            put(converter.finish())
+        stdout.close()
+        proc.wait()
+    remember_file_hash(testfn, new_hash.hexdigest())
+    if proc.returncode != 0:
+        printq(cfg.quiet, colored_verdict('W', 'Failed to execute generator line: %s' % cmd))
         return False
-    new_data = read_file_contents(testfn)
-    if new_data is not None and get_eoln_char(contest_eoln_style) != get_eoln_char():
-        new_data = convert_eoln(new_data, contest_eoln_style)
-        write_file_contents(testfn, new_data)
-    if old_data is not None and old_data != new_data:
+    if old_hash is not None and old_hash != new_hash.hexdigest():
         printq(cfg.quiet, colored_verdict('M', 'Contents of %s has changed' % testfn))
         return False
     return True
@@ -1350,15 +3241,44 @@ def execute_generation_line(cfg, line):
 # executes the whole simple generation script with all its lines
 # returns pair of list of successfully generated tests, and list of tests failed to generate
 # if cfg.stop=True, then lists may be incomplete (they include all tests up to first error inclusive)
+# if cfg.jobs > 1, then lines are executed in parallel (results are same as for sequential execution)
+# if cfg.gen_manifest is set, then lines with up-to-date input files are skipped (see GenerationManifest)
 def execute_generation_script(cfg, script):
     # type: (Config, List[GenScriptLine]) -> Tuple[List[int], List[int]]
+    lock = threading.Lock()
+    first_fail = [len(script)]
+
+    def work(worker, i):
+        # type: (int, int) -> Optional[bool]
+        with lock:
+            if cfg.stop and i > first_fail[0]:
+                return None     # would not be run sequentially
+        if cfg.gen_manifest is not None and cfg.gen_manifest.is_input_up_to_date(script[i]):
+            printq(cfg.quiet, "Up to date: %s" % get_test_input(script[i].test))
+            return True
+        res = execute_generation_line(cfg, script[i])
+        if not res:
+            with lock:
+                first_fail[0] = min(first_fail[0], i)
+        elif cfg.gen_manifest is not None:
+            cfg.gen_manifest.record_input(script[i])
+        return res
+
+    if cfg.jobs > 1:
+        results = run_parallel_jobs(cfg.jobs, list(range(len(script))), work)
+    else:
+        results = []
+        for i in range(len(script)):
+            results.append(work(0, i))
+            if cfg.stop and not results[-1]:
+                break
     successes = []      # type: List[int]
     fails = []          # type: List[int]
-    for line in script:
-        res = execute_generation_line(cfg, line)
-        (successes if res else fails).append(line.test)
-        if not res and cfg.stop:
+    for i,res in enumerate(results):
+        if i > first_fail[0] and cfg.stop:
             break
+        if res is not None:
+            (successes if res else fails).append(script[i].test)
     return (successes, fails)
 
 # pretty-print results of execute_generation_script
@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 # some user preferences can be set here
 
 # for each compiler, specify flags added to command line
@@ -56,6 +56,73 @@ enable_stdout_redirection = True
 # when set to true, stderr is also redirected to temp file (usually not needed)
 enable_stderr_redirection = False
 
+# path to cgroup v2 directory where current user may create child cgroups (e.g. delegated by systemd or admin)
+# if set, each run of solution/interactor is put into its own child cgroup on Linux:
+#   CPU time and anonymous memory are taken from cpu.stat and memory.stat, including all forked children
+#   memory.max is set to twice the memory limit as a hard backstop (it counts page cache and tmpfs pages too)
+# if not set (or cgroup cannot be created), limits are enforced by sampling via psutil
+cgroup_root = None      # type: Optional[str]
+
+# directory for intermediate files of solution runs (input.txt, output.txt, _stdout_, stress_test.in, etc.)
+# if None, they are put into the problem directory; RAM-backed directory (e.g. '/dev/shm') removes disk latency
+# each run creates its own subdirectory there, which is deleted afterwards
+# failed runs are kept in its subdirectory nsuolymp_failed/{problem} for inspection
+scratch_root = None     # type: Optional[str]
+
+# whether checker of a test runs in background while solution is run on the next test (see testsol --pipeline)
+# it works only when tests are run one at a time, since parallel runs overlap with checkers anyway
+# note that checker competes with solution for CPU then, so measured time of solution may be inflated (especially on one core)
+pipeline_checker = False
+
+# order in which tests are dispatched to workers when they are run in parallel (see testsol --jobs)
+# 'lpt' means longest first: by time remembered from previous runs, or by input size if unknown
+# 'order' means in order of tests
+parallel_schedule = 'lpt'
+
+# directory where persistent state is kept: verdict cache, checker memo, run history, tests statistics, generation manifest
+# if absolute, then each problem gets its own subdirectory in it (named by problem directory and hash of its path)
+# if relative (e.g. '.nsuolymp'), then state is put directly into this subdirectory of problem directory
+# if None, then ~/.cache/nsuolymp is used, so that problem directory (usually under version control) is not polluted
+state_root = None       # type: Optional[str]
+
+# maximal number of results stored in verdict cache of a problem (see testsol --no-cache)
+verdict_cache_size = 20000
+
+# maximal number of verdicts stored in checker memo of a problem (see testsol --no-cache)
+checker_memo_size = 100000
+
+# SQLite database where all solution runs are recorded by testsol (see testsol --compare-baseline)
+# if None, it is history.sqlite in the state directory of the problem (see state_root)
+run_history_path = None         # type: Optional[str]
+# baseline time for a test is the median over this number of previous runs
+history_baseline_runs = 5
+# timing change is reported only if it is greater than both relative threshold and absolute floor (in seconds)
+history_noise_threshold = 0.15
+history_noise_floor = 0.05
+
+# when solution is run several times on each test (testsol --repeat), which statistic of times decides the verdict:
+# 'min', 'median' or 'max'
+repeat_time_statistic = 'median'
+# test is reported as borderline if median time of repeated runs differs from TL by less than this fraction of TL
+borderline_time_margin = 0.2
+
+# whether testsol pins each solution run to a dedicated CPU core (and its interactor to a sibling core), Linux only
+# it makes timings more stable when tests are run in parallel or the machine is busy (see testsol --pin-cpu)
+pin_cpu_cores = False
+# run is marked as measured under CPU contention if it waited for CPU in run queue longer than this fraction of its CPU time
+# (Linux only, since it is taken from /proc/{pid}/schedstat; sleeping or blocking on I/O is not counted)
+# such timings are not trusted: they are not recorded into run history and verdict cache
+contention_wait_ratio = 0.5
+# runs with CPU time less than this (in seconds) are never marked, since their time is dominated by startup
+contention_min_time = 0.25
+
+# default time budget (in seconds) for shrinking a problematic test found by stress testing (see testsol --shrink)
+shrink_time_budget = 60.0
+
+# name of file in problem directory which enables built-in numeric checker instead of checker executable
+# it should contain e.g. "numeric 1e-6" (absolute or relative error) or "numeric 1e-6 1e-9" (absolute and relative errors)
+builtin_checker_file = 'checker.txt'
+
 # specifies how endlines are encoded on the contest testing machines
 # nsuts invokes solutions mainly on Windows platform, hence dos-style is used
 # for Linux-hosted contests, set 'linux' here
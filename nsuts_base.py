@@ -139,7 +139,7 @@ class NsutsClient:
         return json.loads(response.text)['submits']
 
 
-RunResult = NamedTuple('RunResult', [('verdict', str), ('exit_code', int), ('time', float), ('memory', float)])
+RunResult = NamedTuple('RunResult', [('verdict', str), ('exit_code', int), ('time', float), ('memory', float), ('cached', bool), ('times', List[float]), ('wait_time', float)])
 def nsuolymp_get_results(nsuts, submit_ids, submit_names, admin = False):
     # type: (NsutsClient, List[int], List[str], bool) -> Optional[List[Tuple[str, List[RunResult]]]]
     while True:
@@ -156,7 +156,7 @@ def nsuolymp_get_results(nsuts, submit_ids, submit_names, admin = False):
             if verdicts is None:
                 all_ready = False
                 break
-            rr = [RunResult(ver, -1, -1.0, -1.0) for ver in verdicts]
+            rr = [RunResult(ver, -1, -1.0, -1.0, False, [], 0.0) for ver in verdicts]
             out_results.append((submit_names[i], rr))
 
         if all_ready:
@@ -184,7 +184,7 @@ def nsuolymp_get_results(nsuts, submit_ids, submit_names, admin = False):
                     key = str(t+1)
                     test_time = float(tnm[key]["t"]) * 0.001
                     test_memory = float(tnm[key]["m"])
-                rr.append(RunResult(ver, -1, test_time, test_memory))
+                rr.append(RunResult(ver, -1, test_time, test_memory, False, [test_time], 0.0))
             out_results.append((submit_names[i], rr))
 
     return out_results
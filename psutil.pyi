@@ -8,6 +8,7 @@ pcputimes = NamedTuple('pcputimes', [('user', float)])
 pmem = NamedTuple('pmem', [('rss', int)])
 
 class Process:
+	pid: int
 	returncode: Optional[int]
 	stdin: _FILE
 	stdout: _FILE
@@ -21,7 +22,9 @@ class Process:
 def Popen(args: _CMD,
 	stdin: _FILE = ...,
 	stdout: _FILE = ...,
-	stderr: _FILE = ...
+	stderr: _FILE = ...,
+	cwd: Optional[str] = ...,
+	preexec_fn: Optional[Callable[[], None]] = ...
 ) -> Process: ...
 def wait_procs(procs: List[Process], timeout: Optional[float] = ..., callback: Optional[Callable[[Process], None]] = ...) -> Tuple[List[Process], List[Process]]: ...
 
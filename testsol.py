@@ -15,9 +15,28 @@ def main(argv = None):
     parser.add_argument('-c', '--compile', help = "force compilation of solutions and checker from sources", action = "store_true")
     parser.add_argument('-g', '--gen-output', help = "overwrite test output files with answers generated by solution", action = "store_true")
     parser.add_argument('-s', '--stress', help = "stress test solutions; generator with arguments must be specified just afterwards in double quotes", metavar = "GEN")
+    parser.add_argument('--in-memory', help = "stress testing: pass generated tests to solutions via stdin without writing input files", action = "store_true")
+    parser.add_argument('--shrink', help = "stress testing: shrink problematic test for at most SEC seconds (by default taken from config)", nargs = '?', type = float, const = shrink_time_budget, metavar = "SEC")
+    parser.add_argument('--seed', help = "first seed for stress testing or slow tests hunting (random by default)", type = int)
+    parser.add_argument('--hunt-slow', help = "find tests where solutions are slowest; generator with arguments must be specified just afterwards in double quotes", metavar = "GEN")
+    parser.add_argument('--hunt-count', help = "slow tests hunting: number of tests to try", type = int, default = 100, metavar = "N")
+    parser.add_argument('--hunt-top', help = "slow tests hunting: number of slowest tests to report", type = int, default = 10, metavar = "K")
+    parser.add_argument('--hunt-vary', help = "slow tests hunting: how integer generator arguments are changed (they are upper bounds)", choices = ['none', 'random', 'climb'], default = 'none')
     parser.add_argument('-t', '--tl', help = "specify time limit in seconds (by default taken from problem statement, 0 means 'no limit')", type = float)
     parser.add_argument('-m', '--ml', help = "specify memory limit in megabytes (by default taken from problem statement, 0 means 'no limit')", type = float)
     parser.add_argument('-i', '--tests', help = "comma-separated list of test names/globs/ranges to run on (by default all tests are used)", metavar = "TESTS")
+    parser.add_argument('-j', '--jobs', help = "number of tests to run in parallel (0 means 'number of CPU cores')", type = int, default = 1)
+    parser.add_argument('--pipeline', help = "run checker of a test while solution runs on the next test (faster, but checker competes with solution for CPU)", action = "store_true")
+    parser.add_argument('--schedule', help = "order of running tests in parallel: longest first or in order (by default taken from config)", choices = ['lpt', 'order'])
+    parser.add_argument('--scratch', help = "directory for intermediate files, e.g. /dev/shm (by default scratch_root from config)", metavar = "DIR")
+    parser.add_argument('--no-cache', help = "always run solutions and checker, do not use cached results of previous runs", action = "store_true")
+    parser.add_argument('--clear-cache', help = "forget all cached results of previous runs", action = "store_true")
+    parser.add_argument('--no-history', help = "do not record runs into run history database", action = "store_true")
+    parser.add_argument('--compare-baseline', help = "report tests where solution time has changed compared to previous runs (implies --no-cache)", action = "store_true")
+    parser.add_argument('-r', '--repeat', help = "run solution K times on each test, time is a statistic over all runs", type = int, default = 1, metavar = "K")
+    parser.add_argument('--repeat-stat', help = "which statistic of repeated runs is taken as solution time (by default taken from config)", choices = ['min', 'median', 'max'])
+    parser.add_argument('-f', '--fail-fast', help = "stop after first error, running first the tests which failed solutions before and take less time", action = "store_true")
+    parser.add_argument('--pin-cpu', help = "pin each run of solution to a dedicated CPU core (Linux only)", action = "store_true")
     parser.add_argument('--nsuts', help = "test solutions on the remote nsuts testing server", action = "store_true")
     parser.add_argument('--local', help = "test solutions locally (default)", action = "store_true")
     args = parser.parse_args(argv)
@@ -30,13 +49,42 @@ def main(argv = None):
         if test_all_solutions or len(args.solutions) != 1:
             print("Exactly one solution must be specified with --gen-output")
             return 201
-    if args.nsuts and (args.stress or args.gen_output):
+    if args.hunt_slow and (args.stress or args.gen_output):
+        print("Option --hunt-slow is incompatible with --stress and --gen-output")
+        return 203
+    if args.nsuts and (args.stress or args.gen_output or args.hunt_slow):
         print("Some options are incompatible with --nsuts")
         return 202
     if not args.local and not args.nsuts:
         args.local = True
 
-    cfg = Config(quiet = args.quiet, stop = args.stop_on_error)
+    cfg = Config(quiet = args.quiet, stop = args.stop_on_error or args.fail_fast)
+    cfg.fail_fast = args.fail_fast
+    cfg.test_stats = TestOrderStats()
+    cfg.jobs = args.jobs if args.jobs > 0 else (psutil.cpu_count() or 1)
+    cfg.stress_in_memory = args.in_memory
+    cfg.shrink_budget = args.shrink
+    if args.pipeline:
+        cfg.pipeline_checker = True
+    if args.schedule is not None:
+        cfg.schedule = args.schedule
+    if args.scratch is not None:
+        cfg.scratch = args.scratch
+    cfg.repeat = max(args.repeat, 1)
+    if args.pin_cpu:
+        cfg.pin_cpu = True
+    if args.repeat_stat is not None:
+        cfg.repeat_stat = args.repeat_stat
+    if args.compare_baseline:
+        args.no_cache = True    # cached results are not measured, so they have nothing to compare
+    if not args.no_cache:
+        cfg.cache = VerdictCache()
+        cfg.checker_memo = CheckerMemo()
+        if args.clear_cache:
+            cfg.cache.clear()
+            cfg.checker_memo.clear()
+    if not args.no_history:
+        cfg.history = RunHistory()
     # resolve limits
     if args.tl is None or args.ml is None:
         problem_limits = read_limits(find_problem_statement())
@@ -50,7 +98,7 @@ def main(argv = None):
     if args.ml and args.ml > 0.0:
         cfg.ml = args.ml
 
-    compile_results = test_results = stress_results = None
+    compile_results = test_results = stress_results = baseline_results = hunt_results = None
 
     # helper for return code & stop-on-error
     err = [0]
@@ -61,7 +109,7 @@ def main(argv = None):
         compile_list = []
         if args.compile or (not if_exe_exists('check') and not if_exe_exists('interactor')):
             compile_list.extend(get_sources_in_problem(checker = True))
-        if args.compile and args.stress:
+        if args.compile and (args.stress or args.hunt_slow):
             compile_list.extend(get_sources_in_problem(validator = True))
 
         # find out solutions we have to compile
@@ -94,9 +142,11 @@ def main(argv = None):
         # test all solutions
         if args.stress:
             generator = args.stress.split()
-            for seed in stress_test_solutions(cfg, generator, solutions_list):
-                stress_results = seed
+            for problem in stress_test_solutions(cfg, generator, solutions_list, args.seed):
+                stress_results = problem
                 on_error(12, True)
+        elif args.hunt_slow:
+            hunt_results = hunt_slow_tests(cfg, args.hunt_slow.split(), solutions_list, args.hunt_count, args.hunt_top, args.seed, args.hunt_vary)
         elif args.gen_output:
             solution = solutions_list[0]
             test_results = [(solution, check_solution(cfg, solution, args.tests, True))]
@@ -140,13 +190,36 @@ def main(argv = None):
                 test_results = test_results + cast(Any, nsuolymp_get_results(nsuts, ids, names, admin = True))
     except (StopError):
         pass
+    if cfg.cache is not None:
+        cfg.cache.save()
+    if cfg.checker_memo is not None:
+        cfg.checker_memo.save()
+    if cfg.test_stats is not None:
+        cfg.test_stats.save()
+    if cfg.history is not None:
+        if args.compare_baseline:
+            baseline_results = cfg.history.compare_with_baseline()
+        cfg.history.save()
 
     if compile_results is not None:
         print_compile_results(compile_results)
     if test_results is not None:
-        print_solutions_results(test_results)
+        print_solutions_results(test_results, cfg.tl)
+        printq(cfg.quiet, format_staged_bytes())
+        if cfg.jobs > 1:
+            printq(cfg.quiet, format_pool_usage())
+        if checker_usage['runs'] + checker_usage['memo_hits'] > 0:
+            printq(cfg.quiet, format_checker_usage())
+    if baseline_results is not None:
+        print_baseline_comparison(baseline_results)
+    if hunt_results is not None:
+        print_slow_tests(hunt_results)
     if stress_results is not None:
-        print(colored_verdict('W', "Stopped on a problematic test generated with seed = " + str(stress_results)))
+        (seed, shrunk) = stress_results
+        print(colored_verdict('W', "Stopped on a problematic test generated with seed = " + str(seed)))
+        if shrunk is not None:
+            print(colored_verdict('W', "Shrinked test of %d bytes saved as stress_test.in, " % len(shrunk.test) +
+                ("generated by: " if shrunk.generated else "reduced from output of: ") + ' '.join(shrunk.command)))
 
     return err[0]
 
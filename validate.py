@@ -13,6 +13,7 @@ def main(argv = None):
     parser.add_argument('-s', '--samples', help = "check that samples are taken from statements", action = "store_true")
     parser.add_argument('-i', '--indices', help = "check tests' names", action = "store_true")
     parser.add_argument('-o', '--output', help = "check that outputs for tests are present", action = "store_true")
+    parser.add_argument('-j', '--jobs', help = "number of tests to validate in parallel (0 means 'number of CPU cores')", type = int, default = 1)
     parser.add_argument('-a', '--all', help = "check everything (implies -v, -s, -i, -o)", action = "store_true")
     args = parser.parse_args(argv)
     if args.all:
@@ -25,6 +26,7 @@ def main(argv = None):
 
     # preparation
     cfg = Config(quiet = args.quiet, stop = args.stop_on_error)
+    cfg.jobs = args.jobs if args.jobs > 0 else (psutil.cpu_count() or 1)
     compile_results = validator_results = samples_results = indices_results = output_results = None
 
     # helper for return code & stop-on-error
@@ -46,7 +48,7 @@ def main(argv = None):
                 on_error(1)
         # run all types of validation
         if args.validator:
-            validator_results = validate_all_tests(quiet = args.quiet)
+            validator_results = validate_all_tests(quiet = args.quiet, jobs = cfg.jobs)
             if len(validator_results) > 0:
                 on_error(2)
         if args.samples:
@@ -40,13 +40,14 @@ def main(argv = None):
     parser.add_argument('-i', '--interm', help = "delete intermediate files, e.g.: input.txt, answer.txt, stress_test", action = "store_true")
     parser.add_argument('-c', '--compile', help = "delete compile/build artefacts, e.g.: executables, objects, class-es", action = "store_true")
     parser.add_argument('-g', '--generate', help = "delete tests generated by specified script", nargs = '?', const = "gen.cmd")
+    parser.add_argument('-s', '--state', help = "delete persistent state of the problem: cached results, run history, generation manifest", action = "store_true")
     parser.add_argument('-o', '--output', help = "delete output files for all tests", action = "store_true")
-    parser.add_argument('-a', '--all', help = "delete almost everything (implies -i, -c, -g)", action = "store_true")
+    parser.add_argument('-a', '--all', help = "delete almost everything (implies -i, -c, -g, -s)", action = "store_true")
     parser.add_argument('-q', '--quiet', help = "don't ask confirmation, don't print intermediate messages", action = "store_true")
     args = parser.parse_args(argv)
 
     if args.all:
-        args.interm = args.compile = True
+        args.interm = args.compile = args.state = True
         if args.generate is None:
             args.generate = "gen.cmd"
 
@@ -80,6 +81,14 @@ def main(argv = None):
         all_files.append('_stderr_')
         all_files += glob.glob('stress_test.*')
         all_files += list(read_filenames())
+        all_dirs += glob.glob('_sandbox_*')
+        failed_runs_dir = get_failed_runs_directory(Config())
+        if failed_runs_dir is not None:
+            all_dirs.append(failed_runs_dir)
+
+    if args.state:
+        all_dirs.append(get_state_directory())
+        all_dirs.append('.nsuolymp')    # default location in older versions
 
     if args.output:
         all_files += list(map(get_output_by_input, get_tests_inputs()))